@@ -6,21 +6,55 @@ import xbmcaddon
 import xbmcgui
 import xbmcplugin
 
-# Import our API wrapper
-from lib.navidrome_api import NavidromeAPI
-
 ADDON = xbmcaddon.Addon()
 ADDON_HANDLE = int(sys.argv[1])
 BASE_URL = sys.argv[0]
 
+# MIME types for transcoded streams, by transcode format
+TRANSCODE_MIME_TYPES = {
+    'mp3': 'audio/mpeg',
+    'opus': 'audio/ogg',
+    'aac': 'audio/aac'
+}
+
+# MIME types for original streams, by file suffix
+SOURCE_MIME_TYPES = {
+    'flac': 'audio/flac',
+    'mp3': 'audio/mpeg',
+    'opus': 'audio/ogg',
+    'ogg': 'audio/ogg',
+    'aac': 'audio/aac',
+    'm4a': 'audio/mp4',
+    'alac': 'audio/mp4',
+    'wav': 'audio/wav',
+    'wma': 'audio/x-ms-wma',
+    'ape': 'audio/x-monkeys-audio'
+}
+
+# Values of the 'items_per_page' enum setting
+PAGE_SIZES = (50, 100, 200, 500, 1000)
+page_size_cached = None
+
+# Context menu commands, formatted with already URL-quoted values
+STAR_CMD = 'RunPlugin(' + BASE_URL + '?action=star&id={id}&type={type}&name={name})'
+UNSTAR_CMD = 'RunPlugin(' + BASE_URL + '?action=unstar&id={id}&type={type}&name={name})'
+ADD_TO_PLAYLIST_CMD = 'RunPlugin(' + BASE_URL + '?action=add_to_playlist&id={id}&name={name})'
+GO_TO_ALBUM_CMD = 'Container.Update(' + BASE_URL + '?action=album&id={id})'
+GO_TO_ARTIST_CMD = 'Container.Update(' + BASE_URL + '?action=artist&id={id})'
+
+# Track art dicts keyed by cover art id, shared by rows of the same listing
+TRACK_ART_CACHE = {}
+
 
 def get_api():
     """Get configured API instance"""
-    server_url = ADDON.getSetting('server_url')
-    username = ADDON.getSetting('username')
-    password = ADDON.getSetting('password')
+    credentials = (
+        ADDON.getSetting('server_url'),
+        ADDON.getSetting('username'),
+        ADDON.getSetting('password'),
+    )
     
-    if not server_url or not username or not password:
+    if not all(credentials):
         xbmcgui.Dialog().notification(
             'Navidrome',
             'Please configure server settings',
@@ -28,13 +62,43 @@ def get_api():
         )
         return None
     
-    return NavidromeAPI(server_url, username, password)
+    # Imported here so menu-only actions skip loading the network stack
+    from lib.navidrome_api import NavidromeAPI
+    return NavidromeAPI(*credentials)
+
+
+def get_page_size():
+    """Get the configured page size (read once per process)"""
+    global page_size_cached
+    if page_size_cached is None:
+        page_size_cached = PAGE_SIZES[int(ADDON.getSetting('items_per_page') or '2')]
+    return page_size_cached
 
 
 def build_url(query):
     return BASE_URL + "?" + urllib.parse.urlencode(query)
 
 
+def fast_url(action, **params):
+    """Build a plugin URL from an action and already URL-quoted parameter values"""
+    return BASE_URL + "?action=" + action + "".join(
+        "&" + key + "=" + value for key, value in params.items()
+    )
+
+
+def add_menu_items(items, is_folder=True):
+    """Add (label, query) menu entries in a single addDirectoryItems call"""
+    directory_items = []
+    for label, query in items:
+        li = xbmcgui.ListItem(label=label)
+        # Use getMusicInfoTag() instead of setInfo()
+        music_tag = li.getMusicInfoTag()
+        music_tag.setTitle(label)
+        directory_items.append((build_url(query), li, is_folder))
+    
+    xbmcplugin.addDirectoryItems(ADDON_HANDLE, directory_items, len(directory_items))
+
+
 def root_menu():
     """Main menu matching Navidrome structure"""
     items = [
@@ -51,18 +115,7 @@ def root_menu():
     if ADDON.getSettingBool('enable_library_sync'):
         items.append(("Library Sync", {"action": "library_sync_menu"}))
 
-    for label, query in items:
-        url = build_url(query)
-        li = xbmcgui.ListItem(label=label)
-        # Use getMusicInfoTag() instead of setInfo()
-        music_tag = li.getMusicInfoTag()
-        music_tag.setTitle(label)
-        xbmcplugin.addDirectoryItem(
-            handle=ADDON_HANDLE,
-            url=url,
-            listitem=li,
-            isFolder=True,
-        )
+    add_menu_items(items)
 
     xbmcplugin.endOfDirectory(ADDON_HANDLE)
 
@@ -79,18 +132,7 @@ def albums_menu():
         ("Most Played", {"action": "albums_most_played"}),
     ]
 
-    for label, query in items:
-        url = build_url(query)
-        li = xbmcgui.ListItem(label=label)
-        # Use getMusicInfoTag() instead of setInfo()
-        music_tag = li.getMusicInfoTag()
-        music_tag.setTitle(label)
-        xbmcplugin.addDirectoryItem(
-            handle=ADDON_HANDLE,
-            url=url,
-            listitem=li,
-            isFolder=True,
-        )
+    add_menu_items(items)
 
     xbmcplugin.endOfDirectory(ADDON_HANDLE)
 
@@ -101,15 +143,7 @@ def list_artists():
     if not api:
         return
     
-    # Test connection first
-    if not api.ping():
-        xbmcgui.Dialog().notification(
-            'Navidrome',
-            'Failed to connect to server',
-            xbmcgui.NOTIFICATION_ERROR
-        )
-        return
-    
+    # No pre-flight ping: a failed request simply yields no artists
     artists = api.get_artists()
     
     if not artists:
@@ -121,37 +155,38 @@ def list_artists():
         xbmcplugin.endOfDirectory(ADDON_HANDLE)
         return
     
-    for artist in artists:
-        artist_id = artist.get('id')
-        name = artist.get('name', 'Unknown Artist')
-        
-        url = build_url({"action": "artist", "id": artist_id})
-        li = xbmcgui.ListItem(label=name)
-        
-        # Set artist info - use getMusicInfoTag()
-        music_tag = li.getMusicInfoTag()
-        music_tag.setTitle(name)
-        music_tag.setArtist(name)
-        music_tag.setMediaType('artist')
-        
-        # Add cover art if available
-        cover_art = artist.get('coverArt')
-        if cover_art:
-            art_url = api.get_cover_art_url(cover_art)
-            li.setArt({"thumb": art_url, "fanart": art_url})
-        
-        xbmcplugin.addDirectoryItem(
-            handle=ADDON_HANDLE,
-            url=url,
-            listitem=li,
-            isFolder=True
-        )
+    items = [make_artist_item(api, artist) for artist in artists]
+    
+    xbmcplugin.addDirectoryItems(ADDON_HANDLE, items, len(items))
     
     xbmcplugin.addSortMethod(ADDON_HANDLE, xbmcplugin.SORT_METHOD_ARTIST)
     xbmcplugin.setContent(ADDON_HANDLE, 'artists')
     xbmcplugin.endOfDirectory(ADDON_HANDLE)
 
 
+def make_artist_item(api, artist, label_prefix=''):
+    """Build the (url, listitem, isFolder) tuple for an artist"""
+    artist_id = artist.get('id')
+    name = artist.get('name', 'Unknown Artist')
+    
+    url = fast_url("artist", id=urllib.parse.quote_plus(str(artist_id)))
+    li = xbmcgui.ListItem(label=label_prefix + name)
+    
+    # Set artist info - use getMusicInfoTag()
+    music_tag = li.getMusicInfoTag()
+    music_tag.setTitle(name)
+    music_tag.setArtist(name)
+    music_tag.setMediaType('artist')
+    
+    # Add cover art if available
+    cover_art = artist.get('coverArt')
+    if cover_art:
+        art_url = api.get_cover_art_url(cover_art)
+        li.setArt({"thumb": art_url, "fanart": art_url})
+    
+    return url, li, True
+
+
 def list_artist_albums(artist_id):
     """List albums for a specific artist"""
     api = get_api()
@@ -171,24 +206,30 @@ def list_artist_albums(artist_id):
     
     albums = artist.get('album', [])
     
-    for album in albums:
-        add_album_item(api, album)
+    xbmcplugin.addDirectoryItems(
+        ADDON_HANDLE,
+        [make_album_item(api, album) for album in albums],
+        len(albums)
+    )
     
     xbmcplugin.addSortMethod(ADDON_HANDLE, xbmcplugin.SORT_METHOD_ALBUM)
     xbmcplugin.setContent(ADDON_HANDLE, 'albums')
     xbmcplugin.endOfDirectory(ADDON_HANDLE)
 
 
-def add_album_item(api, album):
-    """Helper function to add an album list item"""
+def make_album_item(api, album):
+    """Build the (url, listitem, isFolder) tuple for an album"""
     album_id = album.get('id')
     title = album.get('name', 'Unknown Album')
     artist_name = album.get('artist', 'Unknown Artist')
     artist_id = album.get('artistId')
-    year = int(album.get('year', 0)) if album.get('year') else 0  # Convert to int
+    year = int(album.get('year') or 0)
     starred = album.get('starred') is not None
     
-    url = build_url({"action": "album", "id": album_id})
+    # Quote each value once for the item URL and all context menu URLs
+    album_id_q = urllib.parse.quote_plus(str(album_id))
+    
+    url = fast_url("album", id=album_id_q)
     li = xbmcgui.ListItem(label=title)
     
     # Set album info - use getMusicInfoTag()
@@ -210,32 +251,28 @@ def add_album_item(api, album):
     context_menu = []
     
     # Star/Unstar
+    title_q = urllib.parse.quote_plus(title)
     if starred:
         context_menu.append((
             'Unstar',
-            f'RunPlugin({build_url({"action": "unstar", "id": album_id, "type": "album", "name": title})})'
+            UNSTAR_CMD.format(id=album_id_q, type='album', name=title_q)
         ))
     else:
         context_menu.append((
             'Star',
-            f'RunPlugin({build_url({"action": "star", "id": album_id, "type": "album", "name": title})})'
+            STAR_CMD.format(id=album_id_q, type='album', name=title_q)
         ))
     
     # Go to Artist
     if artist_id:
         context_menu.append((
             f'Go to Artist: {artist_name}',
-            f'Container.Update({build_url({"action": "artist", "id": artist_id})})'
+            GO_TO_ARTIST_CMD.format(id=urllib.parse.quote_plus(str(artist_id)))
         ))
     
     li.addContextMenuItems(context_menu)
     
-    xbmcplugin.addDirectoryItem(
-        handle=ADDON_HANDLE,
-        url=url,
-        listitem=li,
-        isFolder=True
-    )
+    return url, li, True
 
 
 def list_album_tracks(album_id):
@@ -257,35 +294,32 @@ def list_album_tracks(album_id):
     
     tracks = album.get('song', [])
     
-    for track in tracks:
-        add_track_item(api, track)
+    xbmcplugin.addDirectoryItems(
+        ADDON_HANDLE,
+        [make_track_item(api, track) for track in tracks],
+        len(tracks)
+    )
     
     xbmcplugin.addSortMethod(ADDON_HANDLE, xbmcplugin.SORT_METHOD_TRACKNUM)
     xbmcplugin.setContent(ADDON_HANDLE, 'songs')
     xbmcplugin.endOfDirectory(ADDON_HANDLE)
 
 
-def add_track_item(api, track):
-    """Helper function to add a track list item with proper codec info"""
-    track_id = track.get('id')
+def make_track_item(api, track):
+    """Build the (url, listitem, isFolder) tuple for a track"""
+    track_get = track.get
+    track_id = track_get('id')
     
     # Handle both native API and Subsonic API formats
-    title = track.get('title') or track.get('name', 'Unknown Track')
-    artist = track.get('artist') or track.get('artistName', 'Unknown Artist')
-    album_name = track.get('album') or track.get('albumName', 'Unknown Album')
-    duration = int(track.get('duration', 0))  # Convert to int
-    track_number = track.get('track') or track.get('trackNumber', 0)
-    year = int(track.get('year', 0)) if track.get('year') else 0  # Convert to int
-    artist_id = track.get('artistId')
-    album_id = track.get('albumId')
-    starred = track.get('starred') is not None
-    
-    # Get audio format info
-    suffix = track.get('suffix', 'flac').lower()
-    bit_rate = track.get('bitRate', 0)
-    sample_rate = track.get('samplingRate', 44100)
-    bit_depth = track.get('bitDepth', 16)
-    channels = track.get('channels', 2)
+    title = track_get('title') or track_get('name') or 'Unknown Track'
+    artist = track_get('artist') or track_get('artistName') or 'Unknown Artist'
+    album_name = track_get('album') or track_get('albumName') or 'Unknown Album'
+    duration = int(track_get('duration') or 0)
+    track_number = track_get('track') or track_get('trackNumber') or 0
+    year = int(track_get('year') or 0)
+    artist_id = track_get('artistId')
+    album_id = track_get('albumId')
+    starred = track_get('starred') is not None
     
     # Get stream URL
     stream_url = api.get_stream_url(track_id)
@@ -306,28 +340,11 @@ def add_track_item(api, track):
     
     # Determine MIME type based on transcoding settings or original format
     if api.enable_transcoding:
-        # Use transcoded format
-        mime_types = {
-            'mp3': 'audio/mpeg',
-            'opus': 'audio/ogg',
-            'aac': 'audio/aac'
-        }
-        mime_type = mime_types.get(api.transcode_format, 'audio/mpeg')
+        mime_type = TRANSCODE_MIME_TYPES.get(api.transcode_format, 'audio/mpeg')
     else:
-        # Use original format from track metadata
-        mime_types = {
-            'flac': 'audio/flac',
-            'mp3': 'audio/mpeg',
-            'opus': 'audio/ogg',
-            'ogg': 'audio/ogg',
-            'aac': 'audio/aac',
-            'm4a': 'audio/mp4',
-            'alac': 'audio/mp4',
-            'wav': 'audio/wav',
-            'wma': 'audio/x-ms-wma',
-            'ape': 'audio/x-monkeys-audio'
-        }
-        mime_type = mime_types.get(suffix, 'audio/flac')
+        mime_type = SOURCE_MIME_TYPES.get(
+            (track_get('suffix') or 'flac').lower(), 'audio/flac'
+        )
     
     # Set MIME type to ensure PAPlayer is used
     li.setMimeType(mime_type)
@@ -336,51 +353,54 @@ def add_track_item(api, track):
     li.setContentLookup(False)
     
     # Add cover art - handle both native and Subsonic API
-    cover_art = None
-    if track.get('coverArt'):
-        cover_art = track.get('coverArt')
-    elif track.get('coverArtId'):
-        cover_art = track.get('coverArtId')
-    elif track.get('hasCoverArt') and track.get('albumId'):
-        cover_art = track.get('albumId')
+    cover_art = track_get('coverArt') or track_get('coverArtId')
+    if not cover_art and track_get('hasCoverArt'):
+        cover_art = album_id
     
     if cover_art:
-        art_url = api.get_cover_art_url(cover_art)
-        li.setArt({"thumb": art_url})
+        # Tracks of one album share a cover; build its art dict only once
+        art = TRACK_ART_CACHE.get(cover_art)
+        if art is None:
+            art = TRACK_ART_CACHE[cover_art] = {"thumb": api.get_cover_art_url(cover_art)}
+        li.setArt(art)
     
     # Build context menu
     context_menu = []
     
+    # Quote the shared values once for all context menu URLs
+    track_id_q = urllib.parse.quote_plus(str(track_id))
+    title_q = urllib.parse.quote_plus(title)
+    
     # Star/Unstar
     if starred:
         context_menu.append((
             'Unstar',
-            f'RunPlugin({build_url({"action": "unstar", "id": track_id, "type": "song", "name": title})})'
+            UNSTAR_CMD.format(id=track_id_q, type='song', name=title_q)
         ))
     else:
         context_menu.append((
             'Star',
-            f'RunPlugin({build_url({"action": "star", "id": track_id, "type": "song", "name": title})})'
+            STAR_CMD.format(id=track_id_q, type='song', name=title_q)
         ))
     
     # Add to Playlist
     context_menu.append((
         'Add to Playlist',
-        f'RunPlugin({build_url({"action": "add_to_playlist", "id": track_id, "name": title})})'
+        ADD_TO_PLAYLIST_CMD.format(id=track_id_q, name=title_q)
     ))
     
     # Go to Album
     if album_id:
         context_menu.append((
             f'Go to Album: {album_name}',
-            f'Container.Update({build_url({"action": "album", "id": album_id})})'
+            GO_TO_ALBUM_CMD.format(id=urllib.parse.quote_plus(str(album_id)))
         ))
     
     # Go to Artist
     if artist_id:
         context_menu.append((
             f'Go to Artist: {artist}',
-            f'Container.Update({build_url({"action": "artist", "id": artist_id})})'
+            GO_TO_ARTIST_CMD.format(id=urllib.parse.quote_plus(str(artist_id)))
         ))
     
     li.addContextMenuItems(context_menu)
@@ -388,12 +408,7 @@ def add_track_item(api, track):
     # Mark as playable
     li.setProperty('IsPlayable', 'true')
     
-    xbmcplugin.addDirectoryItem(
-        handle=ADDON_HANDLE,
-        url=stream_url,
-        listitem=li,
-        isFolder=False
-    )
+    return stream_url, li, False
 
 def add_load_more_item(action, offset, **extra_params):
     """Add a 'Load More' item for pagination"""
@@ -419,14 +434,21 @@ def list_albums_all(offset=0):
     if not api:
         return
     
-    # Get items per page from settings
-    items_per_page_setting = int(ADDON.getSetting('items_per_page') or '2')
-    items_per_page_values = [50, 100, 200, 500, 1000]
-    items_per_page = items_per_page_values[items_per_page_setting]
-    
-    albums = api.get_album_list('alphabeticalByName', size=items_per_page, offset=offset)
+    items_per_page = get_page_size()
+    
+    # Render each chunk as soon as it arrives while the next ones are fetched
+    album_count = 0
+    for albums in api.iter_album_list('alphabeticalByName', size=items_per_page, offset=offset):
+        if not albums:
+            break
+        album_count += len(albums)
+        xbmcplugin.addDirectoryItems(
+            ADDON_HANDLE,
+            [make_album_item(api, album) for album in albums],
+            items_per_page
+        )
     
-    if not albums:
+    if not album_count:
         if offset == 0:
             xbmcgui.Dialog().notification(
                 'Navidrome',
@@ -436,16 +458,20 @@ def list_albums_all(offset=0):
         xbmcplugin.endOfDirectory(ADDON_HANDLE)
         return
     
-    for album in albums:
-        add_album_item(api, album)
-    
-    # Add "Load More" if we got a full page
-    if len(albums) >= items_per_page:
+    # Add "Load More" if we got a full page, and fetch that next page in the
+    # background while Kodi renders this one so it's answered from the cache
+    prefetch = None
+    if album_count >= items_per_page:
         add_load_more_item("albums_all", offset + items_per_page)
+        prefetch = api.prefetch_album_list('alphabeticalByName', size=items_per_page,
+                                           offset=offset + items_per_page)
     
     xbmcplugin.addSortMethod(ADDON_HANDLE, xbmcplugin.SORT_METHOD_ALBUM)
     xbmcplugin.setContent(ADDON_HANDLE, 'albums')
     xbmcplugin.endOfDirectory(ADDON_HANDLE)
+    
+    if prefetch:
+        prefetch.join()
 
 
 def list_albums_random(offset=0):
@@ -454,9 +480,7 @@ def list_albums_random(offset=0):
     if not api:
         return
     
-    items_per_page_setting = int(ADDON.getSetting('items_per_page') or '2')
-    items_per_page_values = [50, 100, 200, 500, 1000]
-    items_per_page = items_per_page_values[items_per_page_setting]
+    items_per_page = get_page_size()
     
     albums = api.get_album_list('random', size=items_per_page, offset=offset)
     
@@ -470,8 +494,11 @@ def list_albums_random(offset=0):
         xbmcplugin.endOfDirectory(ADDON_HANDLE)
         return
     
-    for album in albums:
-        add_album_item(api, album)
+    xbmcplugin.addDirectoryItems(
+        ADDON_HANDLE,
+        [make_album_item(api, album) for album in albums],
+        len(albums)
+    )
     
     # Add "Load More" if we got a full page
     if len(albums) >= items_per_page:
@@ -481,13 +508,13 @@ def list_albums_random(offset=0):
     xbmcplugin.endOfDirectory(ADDON_HANDLE)
 
 
-def list_albums_recent():
-    """List recently added albums"""
+def list_albums_sorted(list_type):
+    """List the first 50 albums of a fixed server-side ordering"""
     api = get_api()
     if not api:
         return
     
-    albums = api.get_album_list('newest', size=50)
+    albums = api.get_album_list(list_type, size=50)
     
     if not albums:
         xbmcgui.Dialog().notification(
@@ -498,8 +525,11 @@ def list_albums_recent():
         xbmcplugin.endOfDirectory(ADDON_HANDLE)
         return
     
-    for album in albums:
-        add_album_item(api, album)
+    xbmcplugin.addDirectoryItems(
+        ADDON_HANDLE,
+        [make_album_item(api, album) for album in albums],
+        len(albums)
+    )
     
     xbmcplugin.setContent(ADDON_HANDLE, 'albums')
     xbmcplugin.endOfDirectory(ADDON_HANDLE)
@@ -522,80 +552,11 @@ def list_albums_favourites():
         xbmcplugin.endOfDirectory(ADDON_HANDLE)
         return
     
-    for album in albums:
-        add_album_item(api, album)
-    
-    xbmcplugin.setContent(ADDON_HANDLE, 'albums')
-    xbmcplugin.endOfDirectory(ADDON_HANDLE)
-
-
-def list_albums_top_rated():
-    """List top rated albums"""
-    api = get_api()
-    if not api:
-        return
-    
-    albums = api.get_album_list('highest', size=50)
-    
-    if not albums:
-        xbmcgui.Dialog().notification(
-            'Navidrome',
-            'No albums found',
-            xbmcgui.NOTIFICATION_INFO
-        )
-        xbmcplugin.endOfDirectory(ADDON_HANDLE)
-        return
-    
-    for album in albums:
-        add_album_item(api, album)
-    
-    xbmcplugin.setContent(ADDON_HANDLE, 'albums')
-    xbmcplugin.endOfDirectory(ADDON_HANDLE)
-
-
-def list_albums_recently_played():
-    """List recently played albums"""
-    api = get_api()
-    if not api:
-        return
-    
-    albums = api.get_album_list('recent', size=50)
-    
-    if not albums:
-        xbmcgui.Dialog().notification(
-            'Navidrome',
-            'No albums found',
-            xbmcgui.NOTIFICATION_INFO
-        )
-        xbmcplugin.endOfDirectory(ADDON_HANDLE)
-        return
-    
-    for album in albums:
-        add_album_item(api, album)
-    
-    xbmcplugin.setContent(ADDON_HANDLE, 'albums')
-    xbmcplugin.endOfDirectory(ADDON_HANDLE)
-
-
-def list_albums_most_played():
-    """List most played albums"""
-    api = get_api()
-    if not api:
-        return
-    
-    albums = api.get_album_list('frequent', size=50)
-    
-    if not albums:
-        xbmcgui.Dialog().notification(
-            'Navidrome',
-            'No albums found',
-            xbmcgui.NOTIFICATION_INFO
-        )
-        xbmcplugin.endOfDirectory(ADDON_HANDLE)
-        return
-    
-    for album in albums:
-        add_album_item(api, album)
+    xbmcplugin.addDirectoryItems(
+        ADDON_HANDLE,
+        [make_album_item(api, album) for album in albums],
+        len(albums)
+    )
     
     xbmcplugin.setContent(ADDON_HANDLE, 'albums')
     xbmcplugin.endOfDirectory(ADDON_HANDLE)
@@ -607,9 +568,7 @@ def list_songs(offset=0):
     if not api:
         return
 
-    items_per_page_setting = int(ADDON.getSetting('items_per_page') or '2')
-    items_per_page_values = [50, 100, 200, 500, 1000]
-    items_per_page = items_per_page_values[items_per_page_setting]
+    items_per_page = get_page_size()
 
     songs = api.get_all_songs(size=items_per_page, offset=offset)
 
@@ -623,8 +582,11 @@ def list_songs(offset=0):
         xbmcplugin.endOfDirectory(ADDON_HANDLE)
         return
 
-    for track in songs:
-        add_track_item(api, track)
+    xbmcplugin.addDirectoryItems(
+        ADDON_HANDLE,
+        [make_track_item(api, track) for track in songs],
+        len(songs)
+    )
 
     # Add "Load More" if we got a full page
     if len(songs) >= items_per_page:
@@ -654,6 +616,7 @@ def list_radios():
         xbmcplugin.endOfDirectory(ADDON_HANDLE)
         return
     
+    items = []
     for radio in radios:
         radio_id = radio.get('id')
         name = radio.get('name', 'Unknown Radio')
@@ -673,51 +636,13 @@ def list_radios():
         # Mark as playable
         li.setProperty('IsPlayable', 'true')
         
-        xbmcplugin.addDirectoryItem(
-            handle=ADDON_HANDLE,
-            url=stream_url,
-            listitem=li,
-            isFolder=False
-        )
+        items.append((stream_url, li, False))
+    
+    xbmcplugin.addDirectoryItems(ADDON_HANDLE, items, len(items))
     
     xbmcplugin.setContent(ADDON_HANDLE, 'songs')
     xbmcplugin.endOfDirectory(ADDON_HANDLE)
 
-def play_track(track_id):
-    """Play a track"""
-    try:
-        api = get_api()
-        addon = xbmcaddon.Addon()
-        
-        # Get track details for metadata
-        # We need to search for the track or get it from album
-        # For now, just create a basic playable item
-        
-        stream_url = api.get_stream_url(track_id)
-        
-        # Show transcoding notification if enabled
-        if addon.getSettingBool('enable_transcoding'):
-            bitrates = [64, 96, 128, 160, 192, 256, 320]
-            max_bitrate_index = int(addon.getSetting('max_bitrate') or '4')
-            transcode_format = addon.getSetting('transcode_format') or 'mp3'
-            bitrate = bitrates[max_bitrate_index]
-            
-            xbmcgui.Dialog().notification(
-                'Navidrome',
-                f'Transcoding: {transcode_format.upper()} @ {bitrate} kbps',
-                xbmcgui.NOTIFICATION_INFO,
-                2000
-            )
-        
-        play_item = xbmcgui.ListItem(path=stream_url)
-        xbmcplugin.setResolvedUrl(HANDLE, True, listitem=play_item)
-        
-    except Exception as e:
-        xbmc.log(f"NAVIDROME: Error playing track: {str(e)}", xbmc.LOGERROR)
-        xbmcgui.Dialog().notification('Navidrome', 'Error playing track', xbmcgui.NOTIFICATION_ERROR)
-        xbmcplugin.setResolvedUrl(HANDLE, False, xbmcgui.ListItem())
-
-
 def list_playlists():
     """List all playlists"""
     api = get_api()
@@ -735,6 +660,7 @@ def list_playlists():
         xbmcplugin.endOfDirectory(ADDON_HANDLE)
         return
     
+    items = []
     for playlist in playlists:
         playlist_id = playlist.get('id')
         name = playlist.get('name', 'Unknown Playlist')
@@ -753,12 +679,9 @@ def list_playlists():
             art_url = api.get_cover_art_url(cover_art)
             li.setArt({"thumb": art_url})
         
-        xbmcplugin.addDirectoryItem(
-            handle=ADDON_HANDLE,
-            url=url,
-            listitem=li,
-            isFolder=True
-        )
+        items.append((url, li, True))
+    
+    xbmcplugin.addDirectoryItems(ADDON_HANDLE, items, len(items))
     
     xbmcplugin.setContent(ADDON_HANDLE, 'playlists')
     xbmcplugin.endOfDirectory(ADDON_HANDLE)
@@ -783,8 +706,11 @@ def list_playlist_tracks(playlist_id):
     
     tracks = playlist.get('entry', [])
     
-    for track in tracks:
-        add_track_item(api, track)
+    xbmcplugin.addDirectoryItems(
+        ADDON_HANDLE,
+        [make_track_item(api, track) for track in tracks],
+        len(tracks)
+    )
     
     xbmcplugin.setContent(ADDON_HANDLE, 'songs')
     xbmcplugin.endOfDirectory(ADDON_HANDLE)
@@ -814,38 +740,12 @@ def search():
         xbmcplugin.endOfDirectory(ADDON_HANDLE)
         return
     
-    # Add artists
-    for artist in results.get('artist', []):
-        artist_id = artist.get('id')
-        name = artist.get('name', 'Unknown Artist')
-        
-        url = build_url({"action": "artist", "id": artist_id})
-        li = xbmcgui.ListItem(label=f"[Artist] {name}")
-        
-        music_tag = li.getMusicInfoTag()
-        music_tag.setTitle(name)
-        music_tag.setArtist(name)
-        music_tag.setMediaType('artist')
-        
-        cover_art = artist.get('coverArt')
-        if cover_art:
-            art_url = api.get_cover_art_url(cover_art)
-            li.setArt({"thumb": art_url})
-        
-        xbmcplugin.addDirectoryItem(
-            handle=ADDON_HANDLE,
-            url=url,
-            listitem=li,
-            isFolder=True
-        )
-    
-    # Add albums
-    for album in results.get('album', []):
-        add_album_item(api, album)
+    # Artists, then albums, then songs in a single batch
+    items = [make_artist_item(api, artist, '[Artist] ') for artist in results.get('artist', [])]
+    items += [make_album_item(api, album) for album in results.get('album', [])]
+    items += [make_track_item(api, track) for track in results.get('song', [])]
     
-    # Add songs
-    for track in results.get('song', []):
-        add_track_item(api, track)
+    xbmcplugin.addDirectoryItems(ADDON_HANDLE, items, len(items))
     
     xbmcplugin.setContent(ADDON_HANDLE, 'mixed')
     xbmcplugin.endOfDirectory(ADDON_HANDLE)
@@ -967,6 +867,7 @@ def list_genres():
         xbmcplugin.endOfDirectory(ADDON_HANDLE)
         return
     
+    items = []
     for genre in genres:
         genre_name = genre.get('value', 'Unknown')
         song_count = genre.get('songCount', 0)
@@ -981,12 +882,9 @@ def list_genres():
         # Optionally use setGenres() with a list if needed:
         # music_tag.setGenres([genre_name])
         
-        xbmcplugin.addDirectoryItem(
-            handle=ADDON_HANDLE,
-            url=url,
-            listitem=li,
-            isFolder=True
-        )
+        items.append((url, li, True))
+    
+    xbmcplugin.addDirectoryItems(ADDON_HANDLE, items, len(items))
     
     xbmcplugin.addSortMethod(ADDON_HANDLE, xbmcplugin.SORT_METHOD_LABEL)
     xbmcplugin.setContent(ADDON_HANDLE, 'genres')
@@ -1000,17 +898,7 @@ def list_genre_content(genre_name):
         (f"Songs ({genre_name})", {"action": "genre_songs", "name": genre_name}),
     ]
     
-    for label, query in items:
-        url = build_url(query)
-        li = xbmcgui.ListItem(label=label)
-        music_tag = li.getMusicInfoTag()
-        music_tag.setTitle(label)
-        xbmcplugin.addDirectoryItem(
-            handle=ADDON_HANDLE,
-            url=url,
-            listitem=li,
-            isFolder=True
-        )
+    add_menu_items(items)
     
     xbmcplugin.endOfDirectory(ADDON_HANDLE)
 
@@ -1032,8 +920,11 @@ def list_genre_albums(genre_name):
         xbmcplugin.endOfDirectory(ADDON_HANDLE)
         return
     
-    for album in albums:
-        add_album_item(api, album)
+    xbmcplugin.addDirectoryItems(
+        ADDON_HANDLE,
+        [make_album_item(api, album) for album in albums],
+        len(albums)
+    )
     
     xbmcplugin.setContent(ADDON_HANDLE, 'albums')
     xbmcplugin.endOfDirectory(ADDON_HANDLE)
@@ -1056,8 +947,11 @@ def list_genre_songs(genre_name):
         xbmcplugin.endOfDirectory(ADDON_HANDLE)
         return
     
-    for track in songs:
-        add_track_item(api, track)
+    xbmcplugin.addDirectoryItems(
+        ADDON_HANDLE,
+        [make_track_item(api, track) for track in songs],
+        len(songs)
+    )
     
     xbmcplugin.setContent(ADDON_HANDLE, 'songs')
     xbmcplugin.endOfDirectory(ADDON_HANDLE)
@@ -1071,17 +965,7 @@ def library_sync_menu():
         ("Clear Library", {"action": "sync_clear"}),
     ]
     
-    for label, query in items:
-        url = build_url(query)
-        li = xbmcgui.ListItem(label=label)
-        music_tag = li.getMusicInfoTag()
-        music_tag.setTitle(label)
-        xbmcplugin.addDirectoryItem(
-            handle=ADDON_HANDLE,
-            url=url,
-            listitem=li,
-            isFolder=False
-        )
+    add_menu_items(items, is_folder=False)
     
     xbmcplugin.endOfDirectory(ADDON_HANDLE)
 
@@ -1104,7 +988,7 @@ def sync_full_library():
     progress.create('Navidrome', 'Starting full library sync...')
     
     try:
-        sync = LibrarySync(api)
+        sync = LibrarySync(api, progress.update, progress.iscanceled)
         success = sync.full_sync()
         
         if success:
@@ -1121,6 +1005,12 @@ def sync_full_library():
                 'Sync complete! Your music is now in Kodi\'s library.',
                 'Go to Music > Artists/Albums/Songs to browse.'
             )
+        elif sync.cancelled:
+            xbmcgui.Dialog().notification(
+                'Navidrome',
+                'Full sync cancelled',
+                xbmcgui.NOTIFICATION_INFO
+            )
         else:
             xbmcgui.Dialog().notification(
                 'Navidrome',
@@ -1151,7 +1041,7 @@ def sync_incremental():
     progress.create('Navidrome', 'Starting incremental sync...')
     
     try:
-        sync = LibrarySync(api)
+        sync = LibrarySync(api, progress.update, progress.iscanceled)
         success = sync.incremental_sync()
         
         if success:
@@ -1167,6 +1057,12 @@ def sync_incremental():
                 'Sync complete! Your music is now in Kodi\'s library.',
                 'Go to Music > Artists/Albums/Songs to browse.'
             )
+        elif sync.cancelled:
+            xbmcgui.Dialog().notification(
+                'Navidrome',
+                'Incremental sync cancelled',
+                xbmcgui.NOTIFICATION_INFO
+            )
         else:
             xbmcgui.Dialog().notification(
                 'Navidrome',
@@ -1246,7 +1142,7 @@ def play_track(track_id):
         stream_url = api.get_stream_url(track_id)
         
         # Debug log
-        if ADDON.getSettingBool('enable_debug'):
+        if api.enable_debug:
             xbmc.log(f"NAVIDROME: Resolving stream URL: {stream_url}", xbmc.LOGINFO)
         
         # Create playable item
@@ -1259,6 +1155,49 @@ def play_track(track_id):
         xbmc.log(f"NAVIDROME: Error resolving track: {str(e)}", xbmc.LOGERROR)
         xbmcplugin.setResolvedUrl(ADDON_HANDLE, False, xbmcgui.ListItem())
 
+
+# Action name -> handler taking the parsed query parameters
+ROUTES = {
+    "albums_menu": lambda params: albums_menu(),
+    "albums_all": lambda params: list_albums_all(int(params.get("offset", 0))),
+    "albums_random": lambda params: list_albums_random(int(params.get("offset", 0))),
+    "albums_favourites": lambda params: list_albums_favourites(),
+    "artists": lambda params: list_artists(),
+    "artist": lambda params: list_artist_albums(params.get("id")),
+    "album": lambda params: list_album_tracks(params.get("id")),
+    "songs": lambda params: list_songs(int(params.get("offset", 0))),
+    "radios": lambda params: list_radios(),
+    "playlists": lambda params: list_playlists(),
+    "playlist": lambda params: list_playlist_tracks(params.get("id")),
+    "search": lambda params: search(),
+    "star": lambda params: star_item(params.get("id"), params.get("type"), params.get("name")),
+    "unstar": lambda params: unstar_item(params.get("id"), params.get("type"), params.get("name")),
+    "add_to_playlist": lambda params: add_to_playlist_dialog(params.get("id"), params.get("name")),
+    "genres": lambda params: list_genres(),
+    "genre": lambda params: list_genre_content(params.get("name")),
+    "genre_albums": lambda params: list_genre_albums(params.get("name")),
+    "genre_songs": lambda params: list_genre_songs(params.get("name")),
+    "library_sync_menu": lambda params: library_sync_menu(),
+    "sync_full": lambda params: sync_full_library(),
+    "sync_incremental": lambda params: sync_incremental(),
+    "sync_clear": lambda params: sync_clear_library(),
+    "play_track": lambda params: play_track(params.get("id")),
+}
+
+# Album menu actions backed by a getAlbumList2 ordering
+ALBUM_SORTS = {
+    "albums_recent": "newest",
+    "albums_top_rated": "highest",
+    "albums_recently_played": "recent",
+    "albums_most_played": "frequent",
+}
+
+ROUTES.update({
+    action: (lambda params, list_type=list_type: list_albums_sorted(list_type))
+    for action, list_type in ALBUM_SORTS.items()
+})
+
+
 def router(paramstring):
     """Route to the appropriate function"""
     params = dict(urllib.parse.parse_qsl(paramstring))
@@ -1266,62 +1205,11 @@ def router(paramstring):
 
     if action is None:
         root_menu()
-    elif action == "albums_menu":
-        albums_menu()
-    elif action == "albums_all":
-        list_albums_all(int(params.get("offset", 0)))
-    elif action == "albums_random":
-        list_albums_random(int(params.get("offset", 0)))
-    elif action == "albums_favourites":
-        list_albums_favourites()
-    elif action == "albums_top_rated":
-        list_albums_top_rated()
-    elif action == "albums_recent":
-        list_albums_recent()
-    elif action == "albums_recently_played":
-        list_albums_recently_played()
-    elif action == "albums_most_played":
-        list_albums_most_played()
-    elif action == "artists":
-        list_artists()
-    elif action == "artist":
-        list_artist_albums(params.get("id"))
-    elif action == "album":
-        list_album_tracks(params.get("id"))
-    elif action == "songs":
-        list_songs(int(params.get("offset", 0)))
-    elif action == "radios":
-        list_radios()
-    elif action == "playlists":
-        list_playlists()
-    elif action == "playlist":
-        list_playlist_tracks(params.get("id"))
-    elif action == "search":
-        search()
-    elif action == "star":
-        star_item(params.get("id"), params.get("type"), params.get("name"))
-    elif action == "unstar":
-        unstar_item(params.get("id"), params.get("type"), params.get("name"))
-    elif action == "add_to_playlist":
-        add_to_playlist_dialog(params.get("id"), params.get("name"))
-    elif action == "genres":
-        list_genres()
-    elif action == "genre":
-        list_genre_content(params.get("name"))
-    elif action == "genre_albums":
-        list_genre_albums(params.get("name"))
-    elif action == "genre_songs":
-        list_genre_songs(params.get("name"))
-    elif action == "library_sync_menu":
-        library_sync_menu()
-    elif action == "sync_full":
-        sync_full_library()
-    elif action == "sync_incremental":
-        sync_incremental()
-    elif action == "sync_clear":
-        sync_clear_library()
-    elif action == "play_track":
-        play_track(params.get("id"))
+        return
+
+    handler = ROUTES.get(action)
+    if handler:
+        handler(params)
     else:
         xbmc.log(f"Unknown action: {action}", xbmc.LOGWARNING)
         root_menu()
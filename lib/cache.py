@@ -0,0 +1,117 @@
+# ============================================================================
+# lib/cache.py - Short-lived on-disk cache for Subsonic API responses
+# ============================================================================
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import xbmc
+import xbmcaddon
+import xbmcvfs
+
+# orjson is several times faster for the large list responses we cache;
+# it encodes to bytes, which SQLite stores as a blob and both decoders accept
+try:
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:
+    json_dumps = json.dumps
+    json_loads = json.loads
+
+# Chance that opening the cache also deletes expired rows; every plugin
+# invocation opens it, and expired rows are ignored by get() anyway
+PRUNE_CHANCE = 0.05
+
+
+class ResponseCache:
+    """SQLite-backed cache of decoded API responses with a fixed TTL"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """Open the cache database, creating it and now and then pruning stale rows"""
+        if self._conn is None:
+            profile = xbmcvfs.translatePath(xbmcaddon.Addon().getAddonInfo('profile'))
+            xbmcvfs.mkdirs(profile)
+
+            conn = sqlite3.connect(os.path.join(profile, 'cache.db'),
+                                   timeout=5.0, check_same_thread=False)
+            # A lost write only costs a refetch, so skip the fsync on every commit
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS response (
+                    key TEXT PRIMARY KEY,
+                    body TEXT,
+                    ts INTEGER
+                )
+            """)
+            if random.random() < PRUNE_CHANCE:
+                conn.execute("DELETE FROM response WHERE ts < ?", (int(time.time()) - self.ttl,))
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key):
+        """Return the cached response for key, or None if missing or expired"""
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT body, ts FROM response WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            xbmc.log(f"NAVIDROME CACHE: Read failed: {e}", xbmc.LOGWARNING)
+            return None
+
+        if row and time.time() - row[1] < self.ttl:
+            try:
+                return json_loads(row[0])
+            except ValueError:
+                # Truncated or corrupt row; drop it and fetch afresh
+                xbmc.log(f"NAVIDROME CACHE: Discarding unreadable entry for {key}", xbmc.LOGWARNING)
+                try:
+                    with self._lock:
+                        conn = self._connect()
+                        conn.execute("DELETE FROM response WHERE key = ?", (key,))
+                        conn.commit()
+                except sqlite3.Error as e:
+                    xbmc.log(f"NAVIDROME CACHE: Delete failed: {e}", xbmc.LOGWARNING)
+        return None
+
+    def set(self, key, data):
+        """Store a response under key"""
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO response (key, body, ts) VALUES (?, ?, ?)",
+                    (key, json_dumps(data), int(time.time()))
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            xbmc.log(f"NAVIDROME CACHE: Write failed: {e}", xbmc.LOGWARNING)
+
+    def invalidate(self, pattern):
+        """Drop the cached responses whose key matches a SQL LIKE pattern"""
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("DELETE FROM response WHERE key LIKE ?", (pattern,))
+                conn.commit()
+        except sqlite3.Error as e:
+            xbmc.log(f"NAVIDROME CACHE: Invalidate failed: {e}", xbmc.LOGWARNING)
+
+    def clear(self):
+        """Drop every cached response"""
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("DELETE FROM response")
+                conn.commit()
+        except sqlite3.Error as e:
+            xbmc.log(f"NAVIDROME CACHE: Clear failed: {e}", xbmc.LOGWARNING)
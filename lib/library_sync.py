@@ -4,58 +4,269 @@
 
 import sqlite3
 import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
 import xbmc
 import xbmcaddon
 import xbmcvfs
 import os
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
 ADDON = xbmcaddon.Addon()
 ADDON_ID = ADDON.getAddonInfo('id')
 
+# strFileName of synced songs is this plugin URL plus the Navidrome song id
+PLAY_TRACK_URL = f"plugin://{ADDON_ID}/?action=play_track&id="
+
+# Songs written per transaction during a sync (bounds WAL growth)
+COMMIT_INTERVAL = 500
+
+# Concurrent getAlbum requests for albums the song listing didn't cover
+SYNC_WORKERS = 8
+
+# Navidrome ids are stored as navidrome://<id>; every such value sorts in
+# [NAVIDROME_ID_MIN, NAVIDROME_ID_MAX) so range predicates can use an index
+NAVIDROME_ID_MIN = 'navidrome://'
+NAVIDROME_ID_MAX = 'navidrome:/0'
+
+# Indexes on the columns we look Navidrome rows up by. Kodi's unique
+# idxAlbum_2 and idxArtist1 already cover the album and artist MusicBrainz
+# ids; its idxSong7 leads with idAlbum, so songs need their own
+SYNC_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_navidrome_song_mbid ON song (strMusicBrainzTrackID)",
+)
+
+# Indexes created by earlier versions that duplicated Kodi's own
+OBSOLETE_INDEXES = ('idx_navidrome_album_mbid', 'idx_navidrome_artist_mbid')
+
+# navidrome_sync_state rows keyed by this prefix plus an index name hold the
+# CREATE statement of a Kodi index dropped by an earlier version's bulk sync
+# until it has been rebuilt
+DROPPED_INDEX_PREFIX = 'dropped_index:'
+
+# Connection settings for sync writes: wait out Kodi's own locks on every
+# statement, WAL without fsync per commit, and a larger page cache
+DB_PRAGMAS = (
+    "PRAGMA busy_timeout=30000",
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+    # Checkpoint every ~40 MB of WAL rather than every 4 MB during a sync
+    "PRAGMA wal_autocheckpoint=10000",
+)
+
+# Minimum seconds between progress callbacks (each one redraws a Kodi dialog)
+PROGRESS_INTERVAL = 0.1
+
+# Seconds between cancel checks while waiting on the song listing
+CANCEL_POLL_INTERVAL = 0.5
+
+
+class SyncCancelled(Exception):
+    """Raised inside a sync when the user cancels it"""
+
+
 class LibrarySync:
-    def __init__(self, api):
+    def __init__(self, api, progress_callback=None, cancel_callback=None):
         self.api = api
+        self.progress_callback = progress_callback
+        self.cancel_callback = cancel_callback
+        self.cancelled = False
+        self._last_progress = 0.0
         self.lock_file = os.path.join(xbmcvfs.translatePath('special://temp/'), 
                                       f'{ADDON_ID}.sync.lock')
+        self._lock_fd = None
+        self._db_path = None
+
+        # Kodi ids by lookup key, loaded once per sync by _load_id_caches
+        self._artist_mbid_ids = {}
+        self._album_mbid_ids = {}
+        self._song_mbids = set()
+        self._role_id = 1
+
+        # dateAdded for every row written by a sync, as datetime('now') would give
+        self._now = None
+
+    def _progress(self, percent, message, *args, force=False):
+        """
+        Report progress as progress_callback(percent, message), formatting
+        message with args only when an update is actually sent
+        """
+        if not self.progress_callback:
+            return
+
+        now = time.monotonic()
+        if force or now - self._last_progress >= PROGRESS_INTERVAL:
+            self._last_progress = now
+            self.progress_callback(percent, message.format(*args))
+
+    def _check_cancelled(self):
+        """Raise SyncCancelled once the user has cancelled the sync"""
+        if not self.cancelled and self.cancel_callback and self.cancel_callback():
+            self.cancelled = True
+        if self.cancelled:
+            raise SyncCancelled()
 
     def _acquire_lock(self):
-        """Acquire sync lock"""
-        if xbmcvfs.exists(self.lock_file):
-            stat = xbmcvfs.Stat(self.lock_file)
-            lock_age = time.time() - stat.st_mtime()
-            if lock_age < 3600:  # 1 hour
-                xbmc.log("NAVIDROME SYNC: Another sync is running", xbmc.LOGWARNING)
-                return False
-            xbmcvfs.delete(self.lock_file)
-
-        lock = xbmcvfs.File(self.lock_file, 'w')
-        lock.write(str(time.time()))
-        lock.close()
+        """Acquire sync lock (an OS file lock, released even if Kodi crashes)"""
+        fd = os.open(self.lock_file, os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            xbmc.log("NAVIDROME SYNC: Another sync is running", xbmc.LOGWARNING)
+            return False
+
+        self._lock_fd = fd
         return True
 
     def _release_lock(self):
         """Release sync lock"""
-        if xbmcvfs.exists(self.lock_file):
-            xbmcvfs.delete(self.lock_file)
+        if self._lock_fd is None:
+            return
+
+        try:
+            if fcntl:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+            else:
+                msvcrt.locking(self._lock_fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._lock_fd)
+            self._lock_fd = None
 
     def _get_kodi_db_path(self):
         """Get path to Kodi's music database"""
+        if self._db_path:
+            return self._db_path
+
         db_dir = xbmcvfs.translatePath('special://database/')
-        db_files = [f for f in os.listdir(db_dir) if f.startswith('MyMusic') and f.endswith('.db')]
+        # Pick the highest-numbered MyMusic database; older ones stay behind
+        # after a Kodi upgrade and must not be written to
+        db_files = [f for f in os.listdir(db_dir)
+                    if f.startswith('MyMusic') and f.endswith('.db') and f[7:-3].isdigit()]
 
         if not db_files:
             raise Exception("Could not find Kodi music database")
 
-        db_files.sort(reverse=True)
-        latest_db = os.path.join(db_dir, db_files[0])
+        latest_db = os.path.join(db_dir, max(db_files, key=lambda f: int(f[7:-3])))
 
         xbmc.log(f"NAVIDROME SYNC: Using database {latest_db}", xbmc.LOGINFO)
+        self._db_path = latest_db
         return latest_db
 
-    def _get_or_create_path(self, conn):
-        """Get or create a single path entry for all Navidrome content"""
-        cursor = conn.cursor()
+    def _get_db_connection(self):
+        """
+        Connect to Kodi's music database tuned for bulk writes; transactions
+        are managed explicitly by the caller
+        """
+        conn = sqlite3.connect(self._get_kodi_db_path(), timeout=30.0, isolation_level=None)
+
+        for pragma in DB_PRAGMAS:
+            try:
+                conn.execute(pragma)
+            except sqlite3.Error as e:
+                # Kodi may be holding the database; the defaults still work
+                xbmc.log(f"NAVIDROME SYNC: {pragma} failed: {e}", xbmc.LOGWARNING)
+
+        return conn
+
+    def _checkpoint(self, cursor):
+        """Copy the WAL back into the database and truncate it"""
+        busy, wal_pages, checkpointed = cursor.execute(
+            "PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        xbmc.log(f"NAVIDROME SYNC: WAL checkpoint busy={busy} log={wal_pages} "
+                 f"checkpointed={checkpointed}", xbmc.LOGINFO)
+
+    def _create_indexes(self, cursor):
+        """Index the MusicBrainz id columns Navidrome rows are keyed by"""
+        for sql in SYNC_INDEXES:
+            cursor.execute(sql)
+        for name in OBSOLETE_INDEXES:
+            cursor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+    def _restore_indexes(self, cursor):
+        """
+        Recreate Kodi indexes recorded as dropped by an earlier version's bulk
+        sync that was killed before it could rebuild them
+        """
+        try:
+            indexes = cursor.execute(
+                "SELECT navidrome_id, changed_at FROM navidrome_sync_state "
+                "WHERE substr(navidrome_id, 1, ?) = ?",
+                (len(DROPPED_INDEX_PREFIX), DROPPED_INDEX_PREFIX)
+            ).fetchall()
+        except sqlite3.OperationalError:
+            # No sidecar table yet, so nothing was ever dropped
+            return
+
+        if not indexes:
+            return
+
+        cursor.execute("BEGIN IMMEDIATE")
+        for key, sql in indexes:
+            # The drop itself may have been rolled back with the first batch
+            cursor.execute(sql.replace('CREATE INDEX', 'CREATE INDEX IF NOT EXISTS', 1))
+            cursor.execute("DELETE FROM navidrome_sync_state WHERE navidrome_id = ?", (key,))
+        cursor.execute("COMMIT")
+
+        xbmc.log(f"NAVIDROME SYNC: Restored {len(indexes)} indexes", xbmc.LOGINFO)
+
+    def _load_id_caches(self, cursor):
+        """Load artist, album, song and role ids so lookups during sync skip SQLite"""
+        self._artist_mbid_ids = dict(cursor.execute(
+            "SELECT strMusicBrainzArtistID, idArtist FROM artist "
+            "WHERE strMusicBrainzArtistID IS NOT NULL"
+        ))
+
+        self._album_mbid_ids = dict(cursor.execute(
+            "SELECT strMusicBrainzAlbumID, idAlbum FROM album "
+            "WHERE strMusicBrainzAlbumID IS NOT NULL"
+        ))
 
+        self._song_mbids = {row[0] for row in cursor.execute(
+            "SELECT strMusicBrainzTrackID FROM song "
+            "WHERE strMusicBrainzTrackID >= ? AND strMusicBrainzTrackID < ?",
+            (NAVIDROME_ID_MIN, NAVIDROME_ID_MAX)
+        )}
+
+        # Get role ID for "Artist" (usually 1)
+        result = cursor.execute("SELECT idRole FROM role WHERE strRole = 'Artist'").fetchone()
+        self._role_id = result[0] if result else 1
+
+    def _create_sync_state(self, cursor):
+        """Create the sidecar table recording the album versions last synced"""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS navidrome_sync_state (
+                navidrome_id TEXT PRIMARY KEY,
+                changed_at TEXT
+            )
+        """)
+
+    def _load_synced_versions(self, cursor):
+        """Album versions recorded by the last sync, {} before the first one"""
+        try:
+            return dict(cursor.execute(
+                "SELECT navidrome_id, changed_at FROM navidrome_sync_state"))
+        except sqlite3.OperationalError:
+            # The sidecar table is created by the first sync's write phase
+            return {}
+
+    def _album_version(self, album_data):
+        """Fingerprint of an album that changes whenever its contents do"""
+        return '|'.join(str(album_data.get(key, '')) for key in
+                        ('changed', 'created', 'songCount', 'duration'))
+
+    def _get_or_create_path(self, cursor):
+        """Get or create a single path entry for all Navidrome content"""
         # Use plugin:// URL as the path (like Jellyfin does)
         plugin_path = f"plugin://{ADDON_ID}/"
 
@@ -68,54 +279,44 @@ class LibrarySync:
         cursor.execute("INSERT INTO path (strPath, strHash) VALUES (?, '')", (plugin_path,))
         return cursor.lastrowid
 
-    def _get_or_create_artist(self, conn, artist_data):
+    def _get_or_create_artist(self, cursor, artist_data):
         """Get or create artist in Kodi database"""
-        cursor = conn.cursor()
-
         # Use Navidrome ID as unique identifier
         navidrome_id = f"navidrome://{artist_data['id']}"
 
-        cursor.execute("""
-            SELECT idArtist FROM artist 
-            WHERE strMusicBrainzArtistID = ?
-        """, (navidrome_id,))
-
-        result = cursor.fetchone()
-        if result:
-            return result[0]
+        artist_id = self._artist_mbid_ids.get(navidrome_id)
+        if artist_id is not None:
+            return artist_id
 
-        # Create new artist
+        # Create new artist. A plain INSERT rather than UPSERT ... RETURNING:
+        # Kodi's unique idxArtist1/idxAlbum_2 would allow ON CONFLICT, but
+        # RETURNING needs SQLite 3.35, newer than some supported Kodi builds ship
         cursor.execute("""
             INSERT INTO artist (
                 strArtist, strMusicBrainzArtistID, strSortName,
                 strGenres, strBiography, dateAdded
             )
-            VALUES (?, ?, ?, ?, ?, datetime('now'))
+            VALUES (?, ?, ?, ?, ?, ?)
         """, (
             artist_data.get('name', 'Unknown Artist'),
             navidrome_id,
             artist_data.get('sortName', artist_data.get('name', '')),
             ', '.join(artist_data.get('genres', [])),
-            artist_data.get('biography', '')
+            artist_data.get('biography', ''),
+            self._now
         ))
 
-        return cursor.lastrowid
-
-    def _get_or_create_album(self, conn, album_data, artist_kodi_id):
-        """Get or create album in Kodi database"""
-        cursor = conn.cursor()
+        artist_id = self._artist_mbid_ids[navidrome_id] = cursor.lastrowid
+        return artist_id
 
+    def _get_or_create_album(self, cursor, album_data):
+        """Get or create album in Kodi database, returning (idAlbum, created)"""
         # Use Navidrome ID as unique identifier
         navidrome_id = f"navidrome://{album_data['id']}"
 
-        cursor.execute("""
-            SELECT idAlbum FROM album 
-            WHERE strMusicBrainzAlbumID = ?
-        """, (navidrome_id,))
-
-        result = cursor.fetchone()
-        if result:
-            return result[0]
+        album_id = self._album_mbid_ids.get(navidrome_id)
+        if album_id is not None:
+            return album_id, False
 
         # Create new album
         year = album_data.get('year', 0)
@@ -124,171 +325,403 @@ class LibrarySync:
                 strAlbum, strMusicBrainzAlbumID, strArtistDisp,
                 strGenres, strReleaseDate, iYear, dateAdded, idInfoSetting
             )
-            VALUES (?, ?, ?, ?, ?, ?, datetime('now'), 0)
+            VALUES (?, ?, ?, ?, ?, ?, ?, 0)
         """, (
             album_data.get('name', 'Unknown Album'),
             navidrome_id,
             album_data.get('artist', 'Unknown Artist'),
             album_data.get('genre', ''),
             str(year) if year else '',
-            year
+            year,
+            self._now
         ))
 
-        album_kodi_id = cursor.lastrowid
+        album_id = self._album_mbid_ids[navidrome_id] = cursor.lastrowid
+        return album_id, True
 
-        # Link album to artist
+    def _update_album(self, cursor, album_kodi_id, album_data):
+        """Refresh a changed album's row and drop its artist link for re-adding"""
+        year = album_data.get('year', 0)
         cursor.execute("""
+            UPDATE album SET strAlbum = ?, strArtistDisp = ?, strGenres = ?,
+                             strReleaseDate = ?, iYear = ?
+            WHERE idAlbum = ?
+        """, (
+            album_data.get('name', 'Unknown Album'),
+            album_data.get('artist', 'Unknown Artist'),
+            album_data.get('genre', ''),
+            str(year) if year else '',
+            year,
+            album_kodi_id
+        ))
+        cursor.execute("DELETE FROM album_artist WHERE idAlbum = ?", (album_kodi_id,))
+
+    def _delete_album_songs(self, cursor, album_kodi_ids):
+        """Delete the songs of the given albums and their artist links"""
+        params = [(album_kodi_id,) for album_kodi_id in album_kodi_ids]
+        for album_kodi_id in album_kodi_ids:
+            self._song_mbids.difference_update(row[0] for row in cursor.execute(
+                "SELECT strMusicBrainzTrackID FROM song WHERE idAlbum = ?", (album_kodi_id,)))
+        cursor.executemany("""
+            DELETE FROM song_artist WHERE idSong IN (SELECT idSong FROM song WHERE idAlbum = ?)
+        """, params)
+        cursor.executemany("DELETE FROM song WHERE idAlbum = ?", params)
+
+    def _remove_missing_albums(self, cursor, server_album_ids):
+        """Delete synced albums that are no longer on the server, returning how many"""
+        gone = [(mbid[len(NAVIDROME_ID_MIN):], album_kodi_id)
+                for mbid, album_kodi_id in self._album_mbid_ids.items()
+                if mbid.startswith(NAVIDROME_ID_MIN)
+                and mbid[len(NAVIDROME_ID_MIN):] not in server_album_ids]
+        if not gone:
+            return 0
+
+        album_kodi_ids = [album_kodi_id for _, album_kodi_id in gone]
+        self._delete_album_songs(cursor, album_kodi_ids)
+        params = [(album_kodi_id,) for album_kodi_id in album_kodi_ids]
+        cursor.executemany("DELETE FROM album_artist WHERE idAlbum = ?", params)
+        cursor.executemany("DELETE FROM album WHERE idAlbum = ?", params)
+        cursor.executemany("DELETE FROM navidrome_sync_state WHERE navidrome_id = ?",
+                           [(navidrome_id,) for navidrome_id, _ in gone])
+        for navidrome_id, _ in gone:
+            del self._album_mbid_ids[NAVIDROME_ID_MIN + navidrome_id]
+        return len(gone)
+
+    def _add_albums(self, cursor, albums, artist_kodi_id, rewrite):
+        """
+        Add an artist's albums, returning {navidrome album id: idAlbum}.
+        Albums already in Kodi whose ids are in rewrite get their row and
+        artist link refreshed.
+        """
+        album_ids = {}
+        links = []
+
+        for album_data in albums:
+            album_kodi_id, created = self._get_or_create_album(cursor, album_data)
+            album_ids[album_data['id']] = album_kodi_id
+            if not created and album_data['id'] in rewrite:
+                self._update_album(cursor, album_kodi_id, album_data)
+                created = True
+            if created:
+                links.append((artist_kodi_id, album_kodi_id,
+                              album_data.get('artist', 'Unknown Artist')))
+
+        # Link new albums to the artist in one batch
+        cursor.executemany("""
             INSERT OR IGNORE INTO album_artist (idArtist, idAlbum, iOrder, strArtist)
             VALUES (?, ?, 0, ?)
-        """, (artist_kodi_id, album_kodi_id, album_data.get('artist', 'Unknown Artist')))
-
-        return album_kodi_id
-
-    def _add_song(self, conn, song_data, album_kodi_id, path_id):
-        """Add song to Kodi database"""
-        cursor = conn.cursor()
-
-        # Use Navidrome ID as unique identifier
-        navidrome_id = f"navidrome://{song_data['id']}"
-
-        # Check if song already exists
-        cursor.execute("""
-            SELECT idSong FROM song 
-            WHERE strMusicBrainzTrackID = ?
-        """, (navidrome_id,))
+        """, links)
 
-        result = cursor.fetchone()
-        if result:
-            return result[0]
+        return album_ids
 
-        # Create plugin URL as filename (like Jellyfin does)
-        plugin_url = f"plugin://{ADDON_ID}/?action=play_track&id={song_data['id']}"
+    def _build_song_row(self, song_data, album_kodi_id, path_id):
+        """Build the song table row for a Navidrome track"""
+        song_get = song_data.get
+        song_id = song_data['id']
 
-        # Calculate track number (disc in upper 16 bits, track in lower 16 bits)
-        disc_num = song_data.get('discNumber', 1)
-        track_num = song_data.get('track', 0)
-        itrack = (disc_num << 16) | track_num
-
-        year = song_data.get('year', 0)
-
-        cursor.execute("""
+        return (
+            album_kodi_id,
+            path_id,
+            song_get('artist', 'Unknown Artist'),
+            song_get('genre', ''),
+            song_get('title', 'Unknown'),
+            # Disc in upper 16 bits, track in lower 16 bits (either may be missing or null)
+            ((song_get('discNumber') or 1) << 16) | (song_get('track') or 0),
+            song_get('duration', 0),
+            song_get('year', 0),
+            # Use plugin URL as filename (like Jellyfin does)
+            PLAY_TRACK_URL + str(song_id),
+            f"navidrome://{song_id}",  # Navidrome ID as unique identifier
+            self._now,
+            song_get('bitRate', 0),
+            song_get('sampleRate', 0),
+            2  # Default to stereo
+        )
+
+    def _add_songs(self, cursor, songs, album_kodi_id, path_id):
+        """Add an album's songs to Kodi database in batches, returning the number added"""
+        # Skip songs that are already in the library
+        existing = self._song_mbids
+        new_songs = [s for s in songs if f"navidrome://{s['id']}" not in existing]
+        if not new_songs:
+            return 0
+        existing.update(f"navidrome://{s['id']}" for s in new_songs)
+
+        cursor.executemany("""
             INSERT INTO song (
                 idAlbum, idPath, strArtistDisp, strGenres, strTitle,
                 iTrack, iDuration, iYear, strFileName,
                 strMusicBrainzTrackID, dateAdded,
                 iBitRate, iSampleRate, iChannels
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'), ?, ?, ?)
-        """, (
-            album_kodi_id,
-            path_id,
-            song_data.get('artist', 'Unknown Artist'),
-            song_data.get('genre', ''),
-            song_data.get('title', 'Unknown'),
-            itrack,
-            song_data.get('duration', 0),
-            year,
-            plugin_url,  # Use plugin URL as filename
-            navidrome_id,
-            song_data.get('bitRate', 0),
-            song_data.get('sampleRate', 0),
-            2  # Default to stereo
-        ))
-
-        song_id = cursor.lastrowid
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [self._build_song_row(s, album_kodi_id, path_id) for s in new_songs])
 
-        # Link song to artist
-        artist_name = song_data.get('artist', 'Unknown Artist')
+        return len(new_songs)
 
-        # Get or create artist for song
-        cursor.execute("SELECT idArtist FROM artist WHERE strArtist = ?", (artist_name,))
-        result = cursor.fetchone()
-
-        if result:
-            artist_id = result[0]
-        else:
-            cursor.execute("""
-                INSERT INTO artist (strArtist, dateAdded)
-                VALUES (?, datetime('now'))
-            """, (artist_name,))
-            artist_id = cursor.lastrowid
+    def _link_song_artists(self, cursor, after_song_id):
+        """
+        Link songs added after after_song_id to the artist named in strArtistDisp,
+        creating missing artists, with two set-based statements
+        """
+        id_range = (NAVIDROME_ID_MIN, NAVIDROME_ID_MAX, after_song_id)
 
-        # Get role ID for "Artist" (usually 1)
-        cursor.execute("SELECT idRole FROM role WHERE strRole = 'Artist'")
-        result = cursor.fetchone()
-        role_id = result[0] if result else 1
+        cursor.execute("""
+            INSERT INTO artist (strArtist, dateAdded)
+            SELECT DISTINCT s.strArtistDisp, ?
+            FROM song s
+            WHERE s.strMusicBrainzTrackID >= ? AND s.strMusicBrainzTrackID < ?
+              AND s.idSong > ?
+              AND NOT EXISTS (SELECT 1 FROM artist a WHERE a.strArtist = s.strArtistDisp)
+        """, (self._now,) + id_range)
 
         cursor.execute("""
             INSERT INTO song_artist (idArtist, idSong, idRole, iOrder, strArtist)
-            VALUES (?, ?, ?, 0, ?)
-        """, (artist_id, song_id, role_id, artist_name))
-
-        return song_id
+            SELECT (SELECT MIN(a.idArtist) FROM artist a WHERE a.strArtist = s.strArtistDisp),
+                   s.idSong, ?, 0, s.strArtistDisp
+            FROM song s
+            WHERE s.strMusicBrainzTrackID >= ? AND s.strMusicBrainzTrackID < ?
+              AND s.idSong > ?
+              AND NOT EXISTS (SELECT 1 FROM song_artist sa WHERE sa.idSong = s.idSong)
+        """, (self._role_id,) + id_range)
+
+    def _max_song_id(self, cursor):
+        """Highest idSong in the library (0 when empty)"""
+        return cursor.execute("SELECT COALESCE(MAX(idSong), 0) FROM song").fetchone()[0]
 
     def full_sync(self):
         """Perform full library sync"""
+        return self._sync(incremental=False)
+
+    def incremental_sync(self):
+        """Sync only albums that are new or changed since the last sync"""
+        return self._sync(incremental=True)
+
+    def _sync(self, incremental):
+        """Sync the Navidrome library into Kodi's music database"""
+        sync_name = "Incremental sync" if incremental else "Full sync"
+
         if not self._acquire_lock():
             xbmc.log("NAVIDROME SYNC: Sync already in progress", xbmc.LOGWARNING)
             return False
 
+        self.cancelled = False
         try:
-            xbmc.log("NAVIDROME SYNC: Starting full sync", xbmc.LOGINFO)
-
-            # Get Kodi database path
-            db_path = self._get_kodi_db_path()
+            xbmc.log(f"NAVIDROME SYNC: Starting {sync_name.lower()}", xbmc.LOGINFO)
+            self._progress(0, "Checking library...", force=True)
 
-            # Connect to database with WAL mode for better concurrency
-            conn = sqlite3.connect(db_path, timeout=30.0)
-            conn.execute("PRAGMA journal_mode=WAL")
+            conn = self._get_db_connection()
 
             try:
-                # Get or create single path entry for all content
-                path_id = self._get_or_create_path(conn)
+                # One cursor is shared by every statement of the sync
+                cursor = conn.cursor()
+
+                # Rebuild indexes left dropped by a sync that was killed mid-way
+                self._restore_indexes(cursor)
+
+                # Nothing to do if the server hasn't rescanned since the last sync.
+                # last_sync holds the server's own lastModified (ms), read before
+                # fetching so a rescan during this sync is caught by the next one
+                try:
+                    last_sync = int(ADDON.getSetting('last_sync') or 0)
+                except ValueError:
+                    last_sync = 0
+                server_modified = self.api.get_last_modified(last_sync)
+                if (incremental and last_sync and server_modified is not None
+                        and server_modified <= last_sync):
+                    xbmc.log("NAVIDROME SYNC: Library unchanged since last sync", xbmc.LOGINFO)
+                    return True
+
+                # Fetch everything from the server first; Kodi's database is
+                # only locked for writing once there is something to write
 
                 # Get all artists from Navidrome
-                artists = self.api.get_artists()
+                artists = self.api.get_artists(use_cache=False)
                 xbmc.log(f"NAVIDROME SYNC: Found {len(artists)} artists", xbmc.LOGINFO)
 
-                total_tracks = 0
+                # Stream the whole library page by page instead of per artist;
+                # a full sync pages through the songs alongside the albums
+                with ThreadPoolExecutor(1) as executor:
+                    songs_future = None if incremental else executor.submit(
+                        self._stream_songs_by_album)
+                    albums = []
+                    for album in self.api.stream_all_albums():
+                        self._check_cancelled()
+                        albums.append(album)
+                    songs_by_album = {}
+                    while songs_future:
+                        try:
+                            songs_by_album = songs_future.result(CANCEL_POLL_INTERVAL)
+                            break
+                        except TimeoutError:
+                            # The song listing stops at its next song once cancelled
+                            self._check_cancelled()
+                xbmc.log(f"NAVIDROME SYNC: Found {len(albums)} albums", xbmc.LOGINFO)
+                self._progress(10, "Found {} albums", len(albums), force=True)
+                server_album_ids = {album['id'] for album in albums}
+
+                if incremental:
+                    # Skip albums already in Kodi whose version matches the last sync
+                    # (plain reads, no transaction; the write phase reloads the ids)
+                    self._load_id_caches(cursor)
+                    synced = self._load_synced_versions(cursor)
+                    albums = [album for album in albums
+                              if f"navidrome://{album['id']}" not in self._album_mbid_ids
+                              or synced.get(album['id']) != self._album_version(album)]
+                    xbmc.log(f"NAVIDROME SYNC: {len(albums)} albums new or changed", xbmc.LOGINFO)
+
+                # Albums whose full song list is in hand, from the song listing
+                # or a successful getAlbum; only these are recorded as synced
+                complete = {album['id'] for album in albums
+                            if len(songs_by_album.get(album['id'], ())) >= album.get('songCount', 0)}
+
+                # Fall back to getAlbum where the song listing came up short
+                # (incremental syncs, servers without empty search3 support, or a failed page)
+                incomplete = [album for album in albums if album['id'] not in complete]
+                if incomplete:
+                    xbmc.log(f"NAVIDROME SYNC: Fetching {len(incomplete)} albums individually",
+                             xbmc.LOGINFO)
+                    executor = ThreadPoolExecutor(SYNC_WORKERS)
+                    # Bypass the response cache: it may be stale and sync shouldn't fill it
+                    futures = {executor.submit(self.api.get_album, album['id'], use_cache=False):
+                               album['id'] for album in incomplete}
+                    try:
+                        for i, future in enumerate(as_completed(futures)):
+                            self._check_cancelled()
+                            self._progress(10, "Fetching album {} of {}", i + 1, len(incomplete))
+                            album_full = future.result()
+                            if album_full:
+                                songs_by_album[futures[future]] = album_full.get('song', [])
+                                complete.add(futures[future])
+                    finally:
+                        # Don't wait for queued requests when cancelled or failed
+                        try:
+                            executor.shutdown(wait=False, cancel_futures=True)
+                        except TypeError:  # Python < 3.9
+                            for future in futures:
+                                future.cancel()
+                            executor.shutdown(wait=False)
+
+                # Group albums by artist so each artist's albums are linked in one batch
+                albums_by_artist = {}
+                for album in albums:
+                    albums_by_artist.setdefault(album.get('artistId'), []).append(album)
+
+                # Write phase: take Kodi's write lock only now
+                cursor.execute("BEGIN IMMEDIATE")
+                self._create_indexes(cursor)
+                self._create_sync_state(cursor)
+                self._load_id_caches(cursor)
+                self._now = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+
+                # Albums already in Kodi whose version changed since the last sync
+                # get their metadata and songs rewritten, provided the new song
+                # list is complete; otherwise the old songs are kept for now
+                synced = self._load_synced_versions(cursor)
+                rewrite = {album['id'] for album in albums
+                           if album['id'] in complete and album.get('artistId')
+                           and f"navidrome://{album['id']}" in self._album_mbid_ids
+                           and synced.get(album['id']) != self._album_version(album)}
+
+                # Their old songs go first, so a song that moved between two
+                # changed albums is re-added to the new one
+                self._delete_album_songs(
+                    cursor, [self._album_mbid_ids[f"navidrome://{album_id}"] for album_id in rewrite])
 
-                for i, artist_data in enumerate(artists):
-                    # Progress update every 10 artists
-                    if i % 10 == 0:
-                        xbmc.log(f"NAVIDROME SYNC: Processing artist {i+1}/{len(artists)}", xbmc.LOGINFO)
+                # Get or create single path entry for all content
+                path_id = self._get_or_create_path(cursor)
 
-                    # Get or create artist
-                    artist_kodi_id = self._get_or_create_artist(conn, artist_data)
+                artist_ids = {}
+                for artist_data in artists:
+                    artist_ids[artist_data['id']] = self._get_or_create_artist(cursor, artist_data)
 
-                    # Get full artist details including albums
-                    artist_full = self.api.get_artist(artist_data['id'])
-                    if not artist_full:
+                total_tracks = 0
+                skipped_albums = 0
+                uncommitted = 0
+                synced_albums = []
+
+                # Songs are linked to their artists in bulk before each commit;
+                # new rows get ids above the current maximum
+                linked_song_id = self._max_song_id(cursor)
+
+                artist_count = len(albums_by_artist)
+                debug = self.api.enable_debug
+                for i, (artist_id, artist_albums) in enumerate(albums_by_artist.items()):
+                    # Log every 100 artists when debugging; the dialog shows progress otherwise
+                    if debug and i % 100 == 0:
+                        xbmc.log(f"NAVIDROME SYNC: Processing artist {i+1}/{artist_count}", xbmc.LOGINFO)
+                    self._progress(10 + 85 * i // artist_count,
+                                   "Writing artist {} of {}", i + 1, artist_count)
+
+                    # Batches already committed stay; the next sync picks up the rest
+                    self._check_cancelled()
+
+                    if not artist_id:
+                        # Nothing to attach the albums to; keep retrying them
+                        skipped_albums += len(artist_albums)
                         continue
-                    
-                    albums = artist_full.get('album', [])
-
-                    for album_data in albums:
-                        # Get or create album
-                        album_kodi_id = self._get_or_create_album(conn, album_data, artist_kodi_id)
-
-                        # Get full album details including tracks
-                        album_full = self.api.get_album(album_data['id'])
-                        if not album_full:
-                            continue
-                        
-                        tracks = album_full.get('song', [])
-
-                        for track_data in tracks:
-                            # Add track to database
-                            self._add_song(conn, track_data, album_kodi_id, path_id)
-                            total_tracks += 1
-
-                # Commit all changes
-                conn.commit()
-                xbmc.log(f"NAVIDROME SYNC: Full sync completed successfully", xbmc.LOGINFO)
+
+                    artist_kodi_id = artist_ids.get(artist_id)
+                    if artist_kodi_id is None:
+                        # Album artist missing from getArtists (e.g. not an indexed artist)
+                        artist_kodi_id = artist_ids[artist_id] = self._get_or_create_artist(
+                            cursor, {'id': artist_id, 'name': artist_albums[0].get('artist', 'Unknown Artist')})
+
+                    album_ids = self._add_albums(cursor, artist_albums, artist_kodi_id, rewrite)
+
+                    for album_data in artist_albums:
+                        # Drop each album's songs once written to keep peak memory down
+                        tracks = songs_by_album.pop(album_data['id'], [])
+
+                        # Add tracks to database
+                        self._add_songs(cursor, tracks, album_ids[album_data['id']], path_id)
+                        total_tracks += len(tracks)
+
+                        if album_data['id'] in complete:
+                            synced_albums.append((album_data['id'], self._album_version(album_data)))
+                        else:
+                            # Songs missing (failed page and getAlbum); leave the
+                            # version unrecorded so the next sync fetches it again
+                            skipped_albums += 1
+
+                        # Commit in chunks so the WAL doesn't grow unbounded
+                        uncommitted += len(tracks)
+                        if uncommitted >= COMMIT_INTERVAL:
+                            self._link_song_artists(cursor, linked_song_id)
+                            linked_song_id = self._max_song_id(cursor)
+                            self._save_sync_state(cursor, synced_albums)
+                            cursor.execute("COMMIT")
+                            cursor.execute("BEGIN IMMEDIATE")
+                            uncommitted = 0
+
+                # Remove albums deleted on the server since they were synced
+                removed = self._remove_missing_albums(cursor, server_album_ids)
+                if removed:
+                    xbmc.log(f"NAVIDROME SYNC: Removed {removed} albums no longer on the server",
+                             xbmc.LOGINFO)
+
+                # Link the remaining songs and commit all changes
+                self._link_song_artists(cursor, linked_song_id)
+                self._save_sync_state(cursor, synced_albums)
+                cursor.execute("COMMIT")
+
+                # Refresh planner statistics for the new rows and fold the WAL
+                # back into the database so Kodi's readers don't scan it
+                cursor.execute("PRAGMA optimize")
+                self._checkpoint(cursor)
+
+                xbmc.log(f"NAVIDROME SYNC: {sync_name} completed successfully", xbmc.LOGINFO)
+                self._progress(100, "Added {} tracks", total_tracks, force=True)
                 xbmc.log(f"NAVIDROME SYNC: Added {total_tracks} tracks to database", xbmc.LOGINFO)
 
-                # Update library timestamp
-                ADDON.setSetting('last_sync', str(int(time.time())))
+                # Only mark the library as synced up to the server's timestamp
+                # when every album made it in; otherwise the next incremental
+                # sync must not short-circuit before retrying the skipped ones
+                if skipped_albums:
+                    xbmc.log(f"NAVIDROME SYNC: {skipped_albums} albums couldn't be fully synced, "
+                             "they will be retried on the next sync", xbmc.LOGWARNING)
+                elif server_modified is not None:
+                    ADDON.setSetting('last_sync', str(server_modified))
 
                 # DON'T trigger automatic library update - let user do it manually
                 # This prevents "checking media" issues
@@ -297,8 +730,14 @@ class LibrarySync:
                 return True
 
             finally:
+                # Discard a half-written sync rather than leave Kodi's database locked
+                if conn.in_transaction:
+                    conn.rollback()
                 conn.close()
 
+        except SyncCancelled:
+            xbmc.log("NAVIDROME SYNC: Sync cancelled", xbmc.LOGINFO)
+            return False
         except Exception as e:
             xbmc.log(f"NAVIDROME SYNC: Error during sync: {e}", xbmc.LOGERROR)
             import traceback
@@ -307,10 +746,22 @@ class LibrarySync:
         finally:
             self._release_lock()
 
-    def incremental_sync(self):
-        """Perform incremental sync"""
-        xbmc.log("NAVIDROME SYNC: Incremental sync not implemented, doing full sync", xbmc.LOGINFO)
-        return self.full_sync()
+    def _stream_songs_by_album(self):
+        """Page through every song in the library, grouped by album id as it arrives"""
+        songs_by_album = {}
+        for song in self.api.stream_all_songs():
+            if self.cancelled:
+                raise SyncCancelled()
+            songs_by_album.setdefault(song.get('albumId'), []).append(song)
+        return songs_by_album
+
+    def _save_sync_state(self, cursor, synced_albums):
+        """Record the versions of the albums written since the last commit"""
+        cursor.executemany("""
+            INSERT OR REPLACE INTO navidrome_sync_state (navidrome_id, changed_at)
+            VALUES (?, ?)
+        """, synced_albums)
+        synced_albums.clear()
 
     def clear_library(self):
         """Clear all Navidrome items from Kodi library"""
@@ -321,41 +772,61 @@ class LibrarySync:
         try:
             xbmc.log("NAVIDROME SYNC: Clearing library", xbmc.LOGINFO)
 
-            # Get Kodi database path
-            db_path = self._get_kodi_db_path()
-
-            # Connect to database
-            conn = sqlite3.connect(db_path, timeout=30.0)
-            conn.execute("PRAGMA journal_mode=WAL")
+            conn = self._get_db_connection()
 
             try:
                 cursor = conn.cursor()
 
+                # Rebuild indexes left dropped by a sync that was killed mid-way
+                self._restore_indexes(cursor)
+
+                cursor.execute("BEGIN IMMEDIATE")
+                self._create_indexes(cursor)
+                self._create_sync_state(cursor)
+                id_range = (NAVIDROME_ID_MIN, NAVIDROME_ID_MAX)
+
+                # Delete the link rows of Navidrome songs and albums first
+                cursor.execute("""
+                    DELETE FROM song_artist WHERE idSong IN (
+                        SELECT idSong FROM song
+                        WHERE strMusicBrainzTrackID >= ? AND strMusicBrainzTrackID < ?
+                    )
+                """, id_range)
+                cursor.execute("""
+                    DELETE FROM album_artist WHERE idAlbum IN (
+                        SELECT idAlbum FROM album
+                        WHERE strMusicBrainzAlbumID >= ? AND strMusicBrainzAlbumID < ?
+                    )
+                """, id_range)
+
                 # Delete songs with navidrome:// MusicBrainz IDs
                 cursor.execute("""
                     DELETE FROM song 
-                    WHERE strMusicBrainzTrackID LIKE 'navidrome://%'
-                """)
+                    WHERE strMusicBrainzTrackID >= ? AND strMusicBrainzTrackID < ?
+                """, id_range)
 
                 # Delete albums with navidrome:// MusicBrainz IDs
                 cursor.execute("""
                     DELETE FROM album 
-                    WHERE strMusicBrainzAlbumID LIKE 'navidrome://%'
-                """)
+                    WHERE strMusicBrainzAlbumID >= ? AND strMusicBrainzAlbumID < ?
+                """, id_range)
 
                 # Delete artists with navidrome:// MusicBrainz IDs
                 cursor.execute("""
                     DELETE FROM artist 
-                    WHERE strMusicBrainzArtistID LIKE 'navidrome://%'
-                """)
+                    WHERE strMusicBrainzArtistID >= ? AND strMusicBrainzArtistID < ?
+                """, id_range)
+
+                # Forget the synced album versions
+                cursor.execute("DELETE FROM navidrome_sync_state")
 
                 # Delete plugin path
-                cursor.execute("""
-                    DELETE FROM path 
-                    WHERE strPath LIKE 'plugin://plugin.kodi.navidrome/%'
-                """)
+                cursor.execute("DELETE FROM path WHERE strPath = ?", (f"plugin://{ADDON_ID}/",))
+
+                cursor.execute("COMMIT")
 
-                conn.commit()
+                # Fold the deletions back into the main database file
+                self._checkpoint(cursor)
 
                 xbmc.log("NAVIDROME SYNC: Library cleared successfully", xbmc.LOGINFO)
 
@@ -368,6 +839,9 @@ class LibrarySync:
                 return True
 
             finally:
+                # Discard a half-written sync rather than leave Kodi's database locked
+                if conn.in_transaction:
+                    conn.rollback()
                 conn.close()
 
         except Exception as e:
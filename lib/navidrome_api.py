@@ -1,12 +1,45 @@
 import json
+import http.client
+import socket
+import threading
 import urllib.request
 import urllib.parse
 import hashlib
 import random
 import string
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
 import xbmc
 import xbmcaddon
 
+# orjson is much faster on large song pages; stdlib json also decodes bytes
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+from lib.cache import ResponseCache
+
+# Read-only Subsonic endpoints whose responses may be served from the cache
+CACHEABLE_ENDPOINTS = {
+    'getArtists', 'getArtist', 'getAlbum', 'getAlbumList2', 'getStarred2',
+    'getPlaylists', 'getPlaylist', 'getGenres', 'getSongsByGenre',
+    'getInternetRadioStations', 'search3',
+}
+
+# Endpoints that change server state and therefore invalidate the cache
+INVALIDATING_ENDPOINTS = {
+    'star', 'unstar', 'setRating', 'createPlaylist', 'updatePlaylist',
+}
+
+# Album lists whose contents change when a play is scrobbled; now-playing
+# updates and the rest of the cache are unaffected
+SCROBBLE_INVALIDATED_LISTS = ('recent', 'frequent')
+
+# Upper bound in seconds for scrobble requests, so a hung server can't tie up
+# the service's worker thread for the full API timeout
+SCROBBLE_TIMEOUT = 5
+
 
 class NavidromeAPI:
     def __init__(self, server_url, username, password):
@@ -15,6 +48,13 @@ class NavidromeAPI:
         self.password = password
         self.client_name = "KodiNavidrome"
         self.api_version = "1.16.1"
+        
+        # Keep-alive HTTP connections to the server, one per thread
+        if urllib.parse.urlsplit(self.server_url).scheme == 'https':
+            self._connection_class = http.client.HTTPSConnection
+        else:
+            self._connection_class = http.client.HTTPConnection
+        self._local = threading.local()
 
         # Get settings
         addon = xbmcaddon.Addon()
@@ -30,10 +70,29 @@ class NavidromeAPI:
         self.enable_debug = addon.getSettingBool('enable_debug')
         self.use_native_api = addon.getSettingBool('use_native_api')
         
-        # Native API token
+        # Response cache (0 disables it)
+        cache_ttl = int(addon.getSetting('cache_ttl') or '60')
+        self.cache = ResponseCache(cache_ttl) if cache_ttl > 0 else None
+        
+        # Native API token (authenticated lazily on first native request)
         self.native_token = None
-        if self.use_native_api:
-            self._authenticate_native()
+        self._native_auth_attempted = False
+        
+        # Subsonic accepts the same salt/token on every request, so sign once
+        # and encode the fixed part of every query string up front
+        self._salt, self._token = self._generate_token()
+        self._base_query = urllib.parse.urlencode({
+            'u': self.username,
+            't': self._token,
+            's': self._salt,
+            'v': self.api_version,
+            'c': self.client_name,
+            'f': 'json'
+        })
+        
+        # Signed getCoverArt and stream URL prefixes, built on first use
+        self._cover_art_base = None
+        self._stream_base = None
     
     def _authenticate_native(self):
         """Authenticate with Navidrome's native API to get JWT token"""
@@ -44,20 +103,19 @@ class NavidromeAPI:
                 'password': self.password
             }).encode('utf-8')
             
-            req = urllib.request.Request(
+            _, body = self._http_request(
                 url,
-                data=data,
-                headers={'Content-Type': 'application/json'},
-                method='POST'
+                method='POST',
+                body=data,
+                headers={'Content-Type': 'application/json'}
             )
             
-            with urllib.request.urlopen(req, timeout=self.api_timeout) as response:
-                result = json.loads(response.read().decode('utf-8'))
-                self.native_token = result.get('token')
-                if self.native_token:
-                    if self.enable_debug:
-                        xbmc.log("NAVIDROME API: Native API authenticated", xbmc.LOGINFO)
-                return self.native_token is not None
+            result = json_loads(body)
+            self.native_token = result.get('token')
+            if self.native_token:
+                if self.enable_debug:
+                    xbmc.log("NAVIDROME API: Native API authenticated", xbmc.LOGINFO)
+            return self.native_token is not None
         except Exception as e:
             if self.enable_debug:
                 xbmc.log(f"NAVIDROME API: Native auth failed: {str(e)}", xbmc.LOGWARNING)
@@ -66,6 +124,10 @@ class NavidromeAPI:
     
     def _make_native_request(self, endpoint, params=None):
         """Make a request to Navidrome's native API"""
+        if not self.native_token and not self._native_auth_attempted:
+            self._native_auth_attempted = True
+            self._authenticate_native()
+        
         if not self.native_token:
             xbmc.log("NAVIDROME API: No native token, falling back to Subsonic", xbmc.LOGWARNING)
             return None
@@ -75,17 +137,19 @@ class NavidromeAPI:
             if params:
                 url += '?' + urllib.parse.urlencode(params)
             
-            req = urllib.request.Request(url)
-            req.add_header('x-nd-authorization', f'Bearer {self.native_token}')
+            response, body = self._http_request(
+                url,
+                headers={'x-nd-authorization': f'Bearer {self.native_token}'},
+                timeout=10
+            )
+            
+            # Update token from response header if present
+            new_token = response.headers.get('x-nd-authorization')
+            if new_token and new_token.startswith('Bearer '):
+                self.native_token = new_token[7:]
             
-            with urllib.request.urlopen(req, timeout=10) as response:
-                # Update token from response header if present
-                new_token = response.headers.get('x-nd-authorization')
-                if new_token and new_token.startswith('Bearer '):
-                    self.native_token = new_token[7:]
-                
-                data = json.loads(response.read().decode('utf-8'))
-                return data
+            data = json_loads(body)
+            return data
         except urllib.error.HTTPError as e:
             xbmc.log(f"NAVIDROME NATIVE API ERROR: {e.code} - {e.reason} for {endpoint}", xbmc.LOGERROR)
             return None
@@ -93,6 +157,71 @@ class NavidromeAPI:
             xbmc.log(f"NAVIDROME NATIVE API ERROR: {str(e)}", xbmc.LOGERROR)
             return None
     
+    def _http_request(self, url, method='GET', body=None, headers=None, timeout=None):
+        """
+        Send a request over this thread's keep-alive connection and return
+        (response, body). Raises urllib.error.HTTPError for HTTP error statuses
+        and urllib.error.URLError for connection failures, like urlopen().
+        """
+        timeout = timeout or self.api_timeout
+        split = urllib.parse.urlsplit(url)
+        path = split.path + ('?' + split.query if split.query else '')
+        
+        while True:
+            conn = getattr(self._local, 'connection', None)
+            reused = conn is not None
+            if not reused:
+                conn = self._connection_class(split.netloc, timeout=timeout)
+                self._local.connection = conn
+            conn.timeout = timeout
+            if conn.sock:
+                # An open connection keeps the timeout it was created with
+                conn.sock.settimeout(timeout)
+            
+            # Whether the failure left the server without a request it acted on
+            unanswered = False
+            try:
+                try:
+                    conn.request(method, path, body=body, headers=headers or {})
+                except (http.client.HTTPException, OSError):
+                    unanswered = True
+                    raise
+                try:
+                    response = conn.getresponse()
+                except http.client.BadStatusLine:
+                    # Closed before any status line (RemoteDisconnected)
+                    unanswered = True
+                    raise
+                data = response.read()
+                break
+            except socket.timeout as e:
+                conn.close()
+                self._local.connection = None
+                raise urllib.error.URLError(e)
+            except (http.client.HTTPException, OSError) as e:
+                conn.close()
+                self._local.connection = None
+                # The server may have closed an idle connection; retry once on a
+                # fresh one, but never once a response started, or a scrobble,
+                # star or playlist change would be sent twice
+                if not (reused and unanswered):
+                    raise urllib.error.URLError(e)
+        
+        if response.will_close:
+            conn.close()
+            self._local.connection = None
+        
+        if 300 <= response.status < 400:
+            # Let urllib follow redirects (e.g. http -> https)
+            req = urllib.request.Request(url, data=body, headers=headers or {}, method=method)
+            with urllib.request.urlopen(req, timeout=timeout) as redirected:
+                return redirected, redirected.read()
+        
+        if response.status >= 400:
+            raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+        
+        return response, data
+    
     def _generate_token(self):
         """Generate salt and token for Subsonic API authentication"""
         salt = ''.join(random.choices(string.ascii_letters + string.digits, k=8))
@@ -101,46 +230,62 @@ class NavidromeAPI:
     
     def _build_url(self, endpoint, params=None):
         """Build Subsonic API URL with authentication"""
-        salt, token = self._generate_token()
+        url = f"{self.server_url}/rest/{endpoint}?{self._base_query}"
+        if params:
+            # doseq repeats list values (e.g. several songId) as Subsonic expects
+            url += '&' + urllib.parse.urlencode(params, doseq=True)
+        return url
+    
+    def _cache_key(self, endpoint, params):
+        """Build a cache key that ignores the per-request auth salt/token"""
+        query = urllib.parse.urlencode(sorted((params or {}).items()), doseq=True)
+        return f"{self.server_url}|{self.username}|{endpoint}?{query}"
+    
+    def _make_request(self, endpoint, params=None, timeout=None):
+        """Make a Subsonic API request, served from the response cache when possible"""
+        cache_key = None
+        if (self.cache and endpoint in CACHEABLE_ENDPOINTS
+                and (params or {}).get('type') != 'random'):
+            cache_key = self._cache_key(endpoint, params)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                if self.enable_debug:
+                    xbmc.log(f"NAVIDROME API: Cache hit for {endpoint}", xbmc.LOGINFO)
+                return cached
         
-        base_params = {
-            'u': self.username,
-            't': token,
-            's': salt,
-            'v': self.api_version,
-            'c': self.client_name,
-            'f': 'json'
-        }
+        response = self._fetch(endpoint, params, timeout)
         
-        if params:
-            base_params.update(params)
+        if response is not None and self.cache:
+            if cache_key:
+                self.cache.set(cache_key, response)
+            elif endpoint in INVALIDATING_ENDPOINTS:
+                self.cache.clear()
         
-        query_string = urllib.parse.urlencode(base_params)
-        return f"{self.server_url}/rest/{endpoint}?{query_string}"
+        return response
     
-    def _make_request(self, endpoint, params=None):
+    def _fetch(self, endpoint, params=None, timeout=None):
         """Make a Subsonic API request and return JSON response"""
         try:
             url = self._build_url(endpoint, params)
             if self.enable_debug:
                 xbmc.log(f"NAVIDROME API: Requesting {endpoint}", xbmc.LOGINFO)
             
-            with urllib.request.urlopen(url, timeout=self.api_timeout) as response:
-                data = json.loads(response.read().decode('utf-8'))
-                
-                # Check for Subsonic API errors
-                if 'subsonic-response' in data:
-                    subsonic_response = data['subsonic-response']
-                    if subsonic_response.get('status') == 'failed':
-                        error = subsonic_response.get('error', {})
-                        error_msg = error.get('message', 'Unknown error')
-                        error_code = error.get('code', 'Unknown')
-                        xbmc.log(f"NAVIDROME API ERROR: {error_code} - {error_msg}", xbmc.LOGERROR)
-                        return None
-                    return subsonic_response
-                
-                return data
-                
+            _, body = self._http_request(url, timeout=timeout)
+            data = json_loads(body)
+            
+            # Check for Subsonic API errors
+            if 'subsonic-response' in data:
+                subsonic_response = data['subsonic-response']
+                if subsonic_response.get('status') == 'failed':
+                    error = subsonic_response.get('error', {})
+                    error_msg = error.get('message', 'Unknown error')
+                    error_code = error.get('code', 'Unknown')
+                    xbmc.log(f"NAVIDROME API ERROR: {error_code} - {error_msg}", xbmc.LOGERROR)
+                    return None
+                return subsonic_response
+            
+            return data
+            
         except urllib.error.HTTPError as e:
             xbmc.log(f"NAVIDROME HTTP ERROR: {e.code} - {e.reason} for endpoint {endpoint}", xbmc.LOGERROR)
             return None
@@ -156,15 +301,13 @@ class NavidromeAPI:
         response = self._make_request('ping')
         return response is not None
     
-    def get_artists(self):
-        """Get all artists"""
-        response = self._make_request('getArtists')
+    def get_artists(self, use_cache=True):
+        """Get all artists (use_cache=False always asks the server, for library sync)"""
+        request = self._make_request if use_cache else self._fetch
+        response = request('getArtists')
         if response and 'artists' in response:
             indexes = response['artists'].get('index', [])
-            all_artists = []
-            for index in indexes:
-                all_artists.extend(index.get('artist', []))
-            return all_artists
+            return list(chain.from_iterable(index.get('artist', ()) for index in indexes))
         return []
     
     def get_artist(self, artist_id):
@@ -174,9 +317,10 @@ class NavidromeAPI:
             return response['artist']
         return None
     
-    def get_album(self, album_id):
-        """Get album details including tracks"""
-        response = self._make_request('getAlbum', {'id': album_id})
+    def get_album(self, album_id, use_cache=True):
+        """Get album details including tracks (use_cache=False bypasses the response cache)"""
+        request = self._make_request if use_cache else self._fetch
+        response = request('getAlbum', {'id': album_id})
         if response and 'album' in response:
             return response['album']
         return None
@@ -195,6 +339,89 @@ class NavidromeAPI:
             return response['albumList2'].get('album', [])
         return []
     
+    def iter_album_list(self, list_type='alphabeticalByName', size=500, offset=0, chunk_size=250):
+        """
+        Yield an album list page as consecutive chunks of at most chunk_size albums.
+        The chunks are requested concurrently, so the caller can render the
+        first one while the rest are still in flight.
+        """
+        offsets = range(offset, offset + size, chunk_size)
+        if not offsets:
+            return
+        with ThreadPoolExecutor(max_workers=len(offsets)) as executor:
+            futures = [
+                executor.submit(self.get_album_list, list_type,
+                                min(chunk_size, offset + size - chunk_offset), chunk_offset)
+                for chunk_offset in offsets
+            ]
+            for future in futures:
+                yield future.result()
+    
+    def prefetch_album_list(self, list_type='alphabeticalByName', size=500, offset=0):
+        """
+        Warm the response cache with an album list page on a background thread.
+        Returns the started thread, or None when the cache is disabled.
+        """
+        if not self.cache:
+            return None
+        thread = threading.Thread(
+            target=lambda: list(self.iter_album_list(list_type, size=size, offset=offset))
+        )
+        thread.start()
+        return thread
+    
+    def get_last_modified(self, since=0):
+        """
+        Server's library lastModified (ms since epoch) from getIndexes, or None
+        if it can't be read. Passing the previous value as since keeps the
+        response small when nothing changed.
+        """
+        response = self._fetch('getIndexes', {'ifModifiedSince': since})
+        if not response:
+            return None
+        return response.get('indexes', {}).get('lastModified')
+    
+    def stream_all_albums(self, page_size=500):
+        """
+        Yield every album in the library by paging getAlbumList2.
+        Bypasses the response cache so a library sync always sees current data.
+        Raises if a page fails, since the sync removes albums missing from the listing.
+        """
+        offset = 0
+        while True:
+            response = self._fetch('getAlbumList2', {
+                'type': 'alphabeticalByArtist',
+                'size': page_size,
+                'offset': offset
+            })
+            if response is None:
+                raise Exception(f"Album listing failed at offset {offset}")
+            albums = response.get('albumList2', {}).get('album', [])
+            yield from albums
+            if len(albums) < page_size:
+                return
+            offset += page_size
+    
+    def stream_all_songs(self, page_size=500):
+        """
+        Yield every song in the library by paging an empty search3 query,
+        which Navidrome answers with all songs. Bypasses the response cache.
+        """
+        offset = 0
+        while True:
+            response = self._fetch('search3', {
+                'query': '',
+                'artistCount': 0,
+                'albumCount': 0,
+                'songCount': page_size,
+                'songOffset': offset
+            })
+            songs = response.get('searchResult3', {}).get('song', []) if response else []
+            yield from songs
+            if len(songs) < page_size:
+                return
+            offset += page_size
+    
     def get_playlists(self):
         """Get all playlists"""
         response = self._make_request('getPlaylists')
@@ -224,7 +451,7 @@ class NavidromeAPI:
     def get_all_songs(self, size=500, offset=0):
         """Get all songs - try native API first, fall back to Subsonic"""
         # Try native API first
-        if self.native_token:
+        if self.use_native_api:
             response = self._make_native_request('song', {
                 '_end': offset + size,
                 '_start': offset,
@@ -253,40 +480,54 @@ class NavidromeAPI:
     
     def get_cover_art_url(self, cover_art_id, size=300):
         """Get cover art URL"""
-        return self._build_url('getCoverArt', {'id': cover_art_id, 'size': size})
+        # Sign once per instance: a fresh salt per row costs an MD5 hash each
+        # and gives Kodi's texture cache a different URL for the same image
+        if self._cover_art_base is None:
+            self._cover_art_base = self._build_url('getCoverArt') + '&id='
+        return f"{self._cover_art_base}{urllib.parse.quote_plus(str(cover_art_id))}&size={size}"
     
     def get_stream_url(self, song_id, max_bit_rate=None):
         """Get stream URL for a song"""
-        params = {'id': song_id}
+        if max_bit_rate and not self.enable_transcoding:
+            return self._build_url('stream', {'id': song_id, 'maxBitRate': max_bit_rate})
         
-        # Use transcoding settings if enabled
-        if self.enable_transcoding:
-            bitrates = [64, 96, 128, 160, 192, 256, 320]
-            params['maxBitRate'] = bitrates[self.max_bitrate]
-            params['format'] = self.transcode_format
-        elif max_bit_rate:
-            params['maxBitRate'] = max_bit_rate
+        # Every other song shares the same parameters: sign once, append the id
+        if self._stream_base is None:
+            params = {}
+            
+            # Use transcoding settings if enabled
+            if self.enable_transcoding:
+                bitrates = [64, 96, 128, 160, 192, 256, 320]
+                params['maxBitRate'] = bitrates[self.max_bitrate]
+                params['format'] = self.transcode_format
+            
+            self._stream_base = self._build_url('stream', params) + '&id='
         
-        return self._build_url('stream', params)
+        return self._stream_base + urllib.parse.quote_plus(str(song_id))
     
     def update_now_playing(self, track_id):
         """Update now playing status"""
         import time
-        response = self._make_request('scrobble', {
+        response = self._fetch('scrobble', {
             'id': track_id,
             'submission': 'false',
             'time': int(time.time() * 1000)
-        })
+        }, timeout=min(self.api_timeout, SCROBBLE_TIMEOUT))
         return response is not None
     
     def scrobble(self, track_id):
         """Scrobble a track (mark as played)"""
         import time
-        response = self._make_request('scrobble', {
+        response = self._fetch('scrobble', {
             'id': track_id,
             'submission': 'true',
             'time': int(time.time() * 1000)
-        })
+        }, timeout=min(self.api_timeout, SCROBBLE_TIMEOUT))
+        if response is not None and self.cache:
+            # Cache keys sort their params, so type comes last
+            for list_type in SCROBBLE_INVALIDATED_LISTS:
+                self.cache.invalidate(
+                    f"{self.server_url}|{self.username}|getAlbumList2?%type={list_type}")
         return response is not None
     
     def get_internet_radios(self):
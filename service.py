@@ -1,9 +1,16 @@
 import xbmc
 import xbmcaddon
+import threading
 import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 
 from lib.navidrome_api import NavidromeAPI
 
+# Seconds a track must stay current before its now-playing update is sent,
+# so skipping through tracks only reports the one the user settles on
+NOW_PLAYING_DELAY = 0.5
+
 
 class NavidromeMonitor(xbmc.Monitor):
     """Monitor for Kodi events"""
@@ -15,6 +22,7 @@ class NavidromeMonitor(xbmc.Monitor):
     def onSettingsChanged(self):
         """Called when addon settings are changed"""
         xbmc.log("NAVIDROME SERVICE: Settings changed, reinitializing API", xbmc.LOGINFO)
+        self.service._reload_settings()
         self.service.init_api()
 
 
@@ -25,9 +33,12 @@ class NavidromePlayer(xbmc.Player):
         super().__init__()
         self.service = service
         self.current_track_id = None
-        self.play_start_time = None
         self.track_duration = 0
+        # time.monotonic() at which the current track has played long enough to scrobble
+        self.scrobble_deadline = None
         self.scrobbled = False
+        self.paused_at = None
+        self._scrobble_timer = None
     
     def onAVStarted(self):
         """Called when playback starts"""
@@ -40,20 +51,29 @@ class NavidromePlayer(xbmc.Player):
         if not track_id:
             return
         
-        xbmc.log(f"NAVIDROME SERVICE: Started playing track {track_id}", xbmc.LOGINFO)
+        if self.service.enable_debug:
+            xbmc.log(f"NAVIDROME SERVICE: Started playing track {track_id}", xbmc.LOGINFO)
         
         self.current_track_id = track_id
-        self.play_start_time = time.time()
+        play_start_time = time.monotonic()
         self.scrobbled = False
+        self.paused_at = None
         
         # Get track duration
         try:
-            self.track_duration = self.getTotalTime()
-        except:
+            self.track_duration = self.getTotalTime() or 0
+        except RuntimeError:
+            # Kodi raises RuntimeError when nothing is playing any more
             self.track_duration = 0
         
+        # Scrobble once played past threshold or at least 4 minutes
+        threshold = (self.track_duration * self.service.scrobble_threshold / 100) if self.track_duration > 0 else 240
+        threshold_seconds = min(threshold, 240)
+        self.scrobble_deadline = play_start_time + threshold_seconds
+        self._schedule_scrobble(threshold_seconds)
+        
         # Update now playing if enabled
-        if self.service.addon.getSettingBool('enable_now_playing'):
+        if self.service.enable_now_playing:
             self.service.update_now_playing(track_id)
     
     def onPlayBackStopped(self):
@@ -67,40 +87,64 @@ class NavidromePlayer(xbmc.Player):
     def onPlayBackPaused(self):
         """Called when playback is paused"""
         xbmc.log("NAVIDROME SERVICE: Playback paused", xbmc.LOGDEBUG)
+        if self.current_track_id and self.paused_at is None:
+            self.paused_at = time.monotonic()
+            self._cancel_scrobble()
     
     def onPlayBackResumed(self):
         """Called when playback resumes"""
         xbmc.log("NAVIDROME SERVICE: Playback resumed", xbmc.LOGDEBUG)
+        if self.current_track_id and self.paused_at is not None:
+            # Time spent paused doesn't count towards the scrobble threshold
+            now = time.monotonic()
+            self.scrobble_deadline += now - self.paused_at
+            self.paused_at = None
+            self._schedule_scrobble(self.scrobble_deadline - now)
+    
+    def _schedule_scrobble(self, delay):
+        """Check the scrobble threshold once, delay seconds from now"""
+        self._cancel_scrobble()
+        if self.scrobbled or not self.service.enable_scrobbling:
+            return
+        
+        self._scrobble_timer = threading.Timer(max(delay, 0), self.check_scrobble_progress)
+        self._scrobble_timer.daemon = True
+        self._scrobble_timer.start()
+    
+    def _cancel_scrobble(self):
+        """Cancel a pending scrobble check"""
+        if self._scrobble_timer:
+            self._scrobble_timer.cancel()
+            self._scrobble_timer = None
     
     def _handle_playback_end(self):
         """Handle end of playback"""
-        if not self.current_track_id:
-            return
+        self._cancel_scrobble()
+        self._try_scrobble()
         
-        # Check if scrobbling is enabled
-        if not self.service.addon.getSettingBool('enable_scrobbling'):
-            self.current_track_id = None
-            self.play_start_time = None
-            return
+        self.current_track_id = None
+        self.scrobble_deadline = None
+    
+    def _try_scrobble(self, reason=''):
+        """
+        Scrobble the current track if it has played past its threshold.
+        Returns the seconds still to go, or None if there is nothing left to scrobble.
+        """
+        if (self.scrobbled or not self.current_track_id or self.scrobble_deadline is None
+                or not self.service.enable_scrobbling):
+            return None
         
-        # Check if we should scrobble
-        if not self.scrobbled and self.play_start_time:
-            play_time = time.time() - self.play_start_time
-            
-            # Get scrobble threshold from settings
-            scrobble_threshold = self.service.addon.getSettingInt('scrobble_threshold') or 50
-            threshold_seconds = (self.track_duration * scrobble_threshold / 100) if self.track_duration > 0 else 240
-            
-            # Scrobble if played past threshold or at least 4 minutes
-            should_scrobble = play_time >= min(threshold_seconds, 240)
-            
-            if should_scrobble:
-                xbmc.log(f"NAVIDROME SERVICE: Scrobbling track {self.current_track_id}", xbmc.LOGINFO)
-                self.service.scrobble(self.current_track_id)
-                self.scrobbled = True
+        # A track stopped while paused only counts the time up to the pause
+        now = self.paused_at if self.paused_at is not None else time.monotonic()
+        remaining = self.scrobble_deadline - now
+        if remaining > 0:
+            return remaining
         
-        self.current_track_id = None
-        self.play_start_time = None
+        if self.service.enable_debug:
+            xbmc.log(f"NAVIDROME SERVICE: Scrobbling track {self.current_track_id}{reason}", xbmc.LOGINFO)
+        self.service.scrobble(self.current_track_id)
+        self.scrobbled = True
+        return None
     
     def _get_navidrome_track_id(self):
         """Extract Navidrome track ID from the playing URL"""
@@ -110,54 +154,33 @@ class NavidromePlayer(xbmc.Player):
             # Check if it's a Navidrome URL (either direct stream or plugin URL)
             if 'rest/stream' in playing_file:
                 # Direct stream URL
-                import urllib.parse
-                parsed = urllib.parse.urlparse(playing_file)
-                params = urllib.parse.parse_qs(parsed.query)
-                
-                if 'id' in params:
-                    return params['id'][0]
-            elif 'plugin.kodi.navidrome' in playing_file and 'track_id=' in playing_file:
-                # Plugin URL from library sync
-                import urllib.parse
-                parsed = urllib.parse.urlparse(playing_file)
-                params = urllib.parse.parse_qs(parsed.query)
-                
-                if 'track_id' in params:
-                    return params['track_id'][0]
+                marker = '&id='
+            elif 'plugin.kodi.navidrome' in playing_file:
+                # Plugin URL from library sync (play_track&id=, or older track_id=)
+                marker = 'track_id=' if 'track_id=' in playing_file else '&id='
+            else:
+                return None
             
-            return None
+            # We build both URLs ourselves, so cut the id out of the query
+            # string directly and only unquote the id itself
+            _, found, rest = playing_file.partition(marker)
+            if not found:
+                return None
+            return urllib.parse.unquote_plus(rest.partition('&')[0]) or None
         except Exception as e:
             xbmc.log(f"NAVIDROME SERVICE: Error getting track ID: {str(e)}", xbmc.LOGERROR)
             return None
     
     def check_scrobble_progress(self):
         """Check if we should scrobble based on playback progress"""
-        if not self.current_track_id or self.scrobbled:
-            return
-        
-        # Check if scrobbling is enabled
-        if not self.service.addon.getSettingBool('enable_scrobbling'):
+        # Stop and end clear current_track_id, so only a pause needs checking here
+        if self.paused_at is not None:
             return
         
-        if not self.isPlayingAudio():
-            return
-        
-        if not self.play_start_time:
-            return
-        
-        play_time = time.time() - self.play_start_time
-        
-        # Get scrobble threshold from settings
-        scrobble_threshold = self.service.addon.getSettingInt('scrobble_threshold') or 50
-        threshold_seconds = (self.track_duration * scrobble_threshold / 100) if self.track_duration > 0 else 240
-        
-        # Scrobble if played past threshold or at least 4 minutes
-        should_scrobble = play_time >= min(threshold_seconds, 240)
-        
-        if should_scrobble:
-            xbmc.log(f"NAVIDROME SERVICE: Scrobbling track {self.current_track_id} (progress)", xbmc.LOGINFO)
-            self.service.scrobble(self.current_track_id)
-            self.scrobbled = True
+        remaining = self._try_scrobble(" (progress)")
+        if remaining:
+            # Timer fired a little early; check again when the deadline passes
+            self._schedule_scrobble(remaining)
 
 
 class NavidromeService:
@@ -166,12 +189,25 @@ class NavidromeService:
     def __init__(self):
         self.addon = xbmcaddon.Addon('plugin.kodi.navidrome')
         self.api = None
+        self._reload_settings()
         self.monitor = NavidromeMonitor(self)
         self.player = NavidromePlayer(self)
         
+        # Now playing and scrobble requests run here, off Kodi's player callback
+        # thread; one worker keeps them in order
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._now_playing_timer = None
+        
         xbmc.log("NAVIDROME SERVICE: Starting", xbmc.LOGINFO)
         self.init_api()
     
+    def _reload_settings(self):
+        """Cache the settings read during playback; refreshed when settings change"""
+        self.enable_now_playing = self.addon.getSettingBool('enable_now_playing')
+        self.enable_scrobbling = self.addon.getSettingBool('enable_scrobbling')
+        self.scrobble_threshold = self.addon.getSettingInt('scrobble_threshold') or 50
+        self.enable_debug = self.addon.getSettingBool('enable_debug')
+    
     def init_api(self):
         """Initialize API connection"""
         try:
@@ -189,25 +225,47 @@ class NavidromeService:
             xbmc.log(f"NAVIDROME SERVICE: Error initializing API: {str(e)}", xbmc.LOGERROR)
             self.api = None
     
+    def _call_api(self, method, track_id, action):
+        """Run an API call on the worker thread, logging failures"""
+        try:
+            method(track_id)
+        except Exception as e:
+            xbmc.log(f"NAVIDROME SERVICE: Error {action}: {str(e)}", xbmc.LOGERROR)
+    
+    def _submit(self, method, track_id, action):
+        """Queue an API call on the worker; timers can still fire after shutdown"""
+        try:
+            self._executor.submit(self._call_api, method, track_id, action)
+        except RuntimeError:
+            if self.enable_debug:
+                xbmc.log(f"NAVIDROME SERVICE: Service stopping, skipped {action}", xbmc.LOGINFO)
+    
     def update_now_playing(self, track_id):
-        """Update now playing status"""
+        """Update now playing status in the background once the track has settled"""
         if not self.api:
             return
         
-        try:
-            self.api.update_now_playing(track_id)
-        except Exception as e:
-            xbmc.log(f"NAVIDROME SERVICE: Error updating now playing: {str(e)}", xbmc.LOGERROR)
+        # A newer track replaces an update that hasn't been sent yet
+        self._cancel_now_playing()
+        self._now_playing_timer = threading.Timer(
+            NOW_PLAYING_DELAY, self._submit,
+            args=(self.api.update_now_playing, track_id, "updating now playing")
+        )
+        self._now_playing_timer.daemon = True
+        self._now_playing_timer.start()
+    
+    def _cancel_now_playing(self):
+        """Cancel a now playing update that hasn't been sent yet"""
+        if self._now_playing_timer:
+            self._now_playing_timer.cancel()
+            self._now_playing_timer = None
     
     def scrobble(self, track_id):
-        """Scrobble a track"""
+        """Scrobble a track in the background"""
         if not self.api:
             return
         
-        try:
-            self.api.scrobble(track_id)
-        except Exception as e:
-            xbmc.log(f"NAVIDROME SERVICE: Error scrobbling: {str(e)}", xbmc.LOGERROR)
+        self._submit(self.api.scrobble, track_id, "scrobbling")
     
     def auto_sync_library(self):
         """Perform automatic library sync if enabled"""
@@ -254,13 +312,12 @@ class NavidromeService:
         # Users should manually sync from the add-on menu
         # self.auto_sync_library()
         
-        # Check every 10 seconds for scrobble progress
-        while not self.monitor.abortRequested():
-            if self.monitor.waitForAbort(10):
-                break
-            
-            # Check if we should scrobble based on progress
-            self.player.check_scrobble_progress()
+        # Scrobbles during playback are checked by a timer set for each track's
+        # threshold, so there is nothing to poll here
+        self.monitor.waitForAbort()
+        self.player._cancel_scrobble()
+        self._cancel_now_playing()
+        self._executor.shutdown(wait=False)
         
         xbmc.log("NAVIDROME SERVICE: Stopped", xbmc.LOGINFO)
 